@@ -7,11 +7,15 @@ from app.analytics.productivity import (
     get_top_weekdays,
     normalize_seasonality
 )
+from app.analytics.engine import DailySeries, build_series, compute_metrics
 
 __all__ = [
     "calculate_productivity_metrics",
     "calculate_burnout_risk",
     "get_top_weekdays",
-    "normalize_seasonality"
+    "normalize_seasonality",
+    "DailySeries",
+    "build_series",
+    "compute_metrics"
 ]
 
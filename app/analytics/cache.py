@@ -0,0 +1,103 @@
+"""
+In-process LRU-кэш метрик продуктивности
+
+Ключ включает версию данных пользователя (users.data_version), которая
+увеличивается при каждом изменении его задач, поэтому записи не устаревают
+и TTL не нужен: после изменения старые ключи просто вытесняются по LRU.
+
+SingleFlight объединяет одновременные вычисления по одному ключу: пока одно
+вычисление идет, остальные вызывающие ждут его результат.
+"""
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш с ограничением по числу записей"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Получить значение и отметить его как недавно использованное"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохранить значение, вытеснив самые давние записи при переполнении"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SingleFlight:
+    """Объединение одновременных вызовов с одинаковым ключом"""
+
+    def __init__(self):
+        self.computations = 0
+        self.coalesced = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        Выполнить fn для ключа; если вычисление по ключу уже идет -
+        дождаться его и вернуть тот же результат (или то же исключение)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = Future()
+                self._calls[key] = future
+                self.computations += 1
+                leader = True
+            else:
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+metrics_cache = LRUCache(settings.METRICS_CACHE_SIZE)
+metrics_flight = SingleFlight()
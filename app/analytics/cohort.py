@@ -0,0 +1,112 @@
+"""
+Пакетный расчет риска выгорания для всей когорты пользователей
+
+Вход - матрица пользователи x дни с количеством выполненных задач за общее
+окно дат. Все шаги конвейера (факторы дней недели, скользящие средние, EMA,
+z-score, компоненты и индекс риска) выполняются как операции над 2-D
+массивами, по строке на пользователя. Формулы те же, что в engine.py.
+"""
+from datetime import date
+from typing import Dict
+
+import numpy as np
+
+from app.analytics.engine import EPSILON, EMA_ALPHA, weekdays
+
+RISK_CATEGORIES = np.array(["низкий", "средний", "высокий"])
+
+
+def streak_matrix(tasks: np.ndarray) -> np.ndarray:
+    """Текущий стрик на каждый день: число подряд идущих дней с задачами"""
+    days = np.arange(tasks.shape[1])
+    last_zero = np.where(tasks > 0, -1, days)
+    np.maximum.accumulate(last_zero, axis=1, out=last_zero)
+    return (days - last_zero).astype(np.int32)
+
+
+def ema_matrix(adj: np.ndarray, alpha: float = EMA_ALPHA) -> np.ndarray:
+    """EMA по оси дней, один векторный шаг на день для всех пользователей"""
+    beta = 1 - alpha
+    weighted = alpha * adj
+    out = np.empty_like(adj)
+    out[:, 0] = adj[:, 0]
+    for t in range(1, adj.shape[1]):
+        np.add(weighted[:, t], beta * out[:, t - 1], out=out[:, t])
+    return out
+
+
+def risk_category(index: np.ndarray) -> np.ndarray:
+    """Категория риска для массива индексов"""
+    return RISK_CATEGORIES[np.searchsorted([0.33, 0.66], index, side='right')]
+
+
+def score_matrix(tasks: np.ndarray, start_date: date) -> Dict[str, np.ndarray]:
+    """
+    Расчет риска выгорания для матрицы tasks (пользователи x дни)
+    Столбец 0 соответствует start_date, дни идут подряд.
+    Возвращает словарь массивов длины len(tasks)
+    """
+    n_days = tasks.shape[1]
+    dates = np.datetime64(start_date, 'D') + np.arange(n_days)
+    weekday = weekdays(dates)
+
+    # 1. Продуктивность по дням недели: суммы по дням недели через one-hot
+    onehot = np.zeros((n_days, 7), dtype=np.float64)
+    onehot[np.arange(n_days), weekday] = 1.0
+    counts = onehot.sum(axis=0)
+    sums = tasks @ onehot
+    means = np.zeros_like(sums)
+    np.divide(sums, counts, out=means, where=counts > 0)
+
+    # 2. Нормализация сезонности
+    mu_all = tasks.mean(axis=1)
+    factors = np.where(
+        (mu_all > EPSILON)[:, None],
+        np.maximum(EPSILON, means / np.where(mu_all > EPSILON, mu_all, 1.0)[:, None]),
+        1.0
+    )
+    adj = tasks / factors[:, weekday]
+
+    # 3. Скользящие средние
+    mean_7 = adj[:, -7:].mean(axis=1)
+    mean_14 = adj[:, -14:].mean(axis=1)
+    mean_28 = adj[:, -28:].mean(axis=1)
+    std_28 = adj[:, -28:].std(axis=1)
+
+    # 4. EMA и 5. z-score последнего дня
+    ema = ema_matrix(adj)
+    z_score = (adj[:, -1] - mean_28) / np.maximum(std_28, 1.0)
+
+    # 6. Компоненты риска выгорания
+    safe_mean_28 = np.where(mean_28 > 1.0, mean_28, 1.0)
+    downshift = np.where(mean_28 > 1.0, np.clip((mean_28 - mean_7) / safe_mean_28, 0.0, 1.0), 0.0)
+    if n_days >= 2:
+        ema_prev, ema_curr = ema[:, -2], ema[:, -1]
+        safe_prev = np.where(ema_prev > 1.0, ema_prev, 1.0)
+        momentum = np.where(ema_prev > 1.0, np.clip((ema_prev - ema_curr) / safe_prev, 0.0, 1.0), 0.0)
+    else:
+        momentum = np.zeros(len(tasks))
+    zeros_rate = np.count_nonzero(tasks[:, -7:] == 0, axis=1) / 7.0
+    streaks = streak_matrix(tasks)
+    streak_strain = 1 / (1 + np.exp(-(0.35 * (streaks[:, -1] - 7))))
+
+    # 7. Индекс риска выгорания
+    index = np.clip(
+        0.35 * downshift + 0.25 * momentum + 0.25 * zeros_rate + 0.15 * streak_strain,
+        0.0, 1.0
+    )
+
+    return {
+        'risk_index': index,
+        'category': risk_category(index),
+        'downshift': downshift,
+        'momentum': momentum,
+        'zeros_rate': zeros_rate,
+        'streak_strain': streak_strain,
+        'z_score': z_score,
+        'mean_7': mean_7,
+        'mean_14': mean_14,
+        'mean_28': mean_28,
+        'std_28': std_28,
+        'streak': streaks[:, -1]
+    }
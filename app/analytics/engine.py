@@ -0,0 +1,191 @@
+"""
+Колоночный движок метрик продуктивности на NumPy
+
+Дневной ряд хранится как пара массивов datetime64[D] / int32, все шаги
+конвейера выполняются над массивами, а преобразование в dict/float
+происходит один раз - на выходе из compute_metrics.
+Результаты бит-в-бит совпадают с пошаговыми функциями из productivity.py
+(см. tests/test_engine_differential.py).
+"""
+from typing import List, Dict, NamedTuple
+from datetime import datetime, date
+import numpy as np
+
+from app.analytics.productivity import (
+    sigmoid,
+    clip,
+    calculate_z_score,
+    calculate_burnout_risk_index
+)
+
+EPSILON = 0.1
+EMA_ALPHA = 0.25
+
+# 1970-01-01 - четверг
+_EPOCH_WEEKDAY = 3
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class DailySeries(NamedTuple):
+    """Дневной ряд: отсортированные уникальные даты и значения по ним"""
+    dates: np.ndarray  # datetime64[D]
+    tasks: np.ndarray  # int32
+    streaks: np.ndarray  # int32
+
+
+def _to_date(value) -> date:
+    """Нормализация даты записи (как в clean_data)"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date()
+    return value
+
+
+def build_series(daily_data: List[Dict]) -> DailySeries:
+    """
+    Построение дневного ряда из списка словарей
+    Дубликаты по дате отбрасываются (остается первая запись), пропуски = 0
+    """
+    n = len(daily_data)
+    ordinals = np.fromiter((_to_date(r['date']).toordinal() for r in daily_data), dtype=np.int64, count=n)
+    dates = (ordinals - _EPOCH_ORDINAL).astype('datetime64[D]')
+    tasks = np.fromiter((r.get('tasks_done') or 0 for r in daily_data), dtype=np.int32, count=n)
+    streaks = np.fromiter((r.get('streak') or 0 for r in daily_data), dtype=np.int32, count=n)
+
+    # np.unique возвращает индекс первого вхождения каждой даты
+    unique_dates, first = np.unique(dates, return_index=True)
+    return DailySeries(unique_dates, tasks[first], streaks[first])
+
+
+def weekdays(dates: np.ndarray) -> np.ndarray:
+    """Дни недели (0=Monday, 6=Sunday) для массива datetime64[D]"""
+    return (dates.astype(np.int64) + _EPOCH_WEEKDAY) % 7
+
+
+def weekday_means(tasks: np.ndarray, weekday: np.ndarray) -> np.ndarray:
+    """Среднее число задач по каждому дню недели, массив из 7 значений"""
+    sums = np.bincount(weekday, weights=tasks, minlength=7)
+    counts = np.bincount(weekday, minlength=7)
+    means = np.zeros(7, dtype=np.float64)
+    np.divide(sums, counts, out=means, where=counts > 0)
+    return means
+
+
+def seasonal_factors(tasks: np.ndarray, means: np.ndarray) -> np.ndarray:
+    """Факторы нормализации сезонности по дням недели"""
+    mu_all = tasks.mean()
+    if mu_all > EPSILON:
+        return np.maximum(EPSILON, means / mu_all)
+    return np.ones(7, dtype=np.float64)
+
+
+def ema(values: np.ndarray, alpha: float = EMA_ALPHA) -> np.ndarray:
+    """
+    Экспоненциальное сглаживание
+    Рекуррентность считается обычным циклом по float: векторная форма
+    (замкнутая формула через cumsum или lfilter) меняет порядок округлений
+    и расходится с calculate_ema в последних битах, а движок обязан
+    совпадать с эталоном бит-в-бит
+    """
+    if values.size == 0:
+        return values.astype(np.float64)
+    beta = 1 - alpha
+    result = []
+    prev = None
+    for x in values.tolist():
+        prev = x if prev is None else alpha * x + beta * prev
+        result.append(prev)
+    return np.array(result, dtype=np.float64)
+
+
+def moving_averages(adj: np.ndarray) -> Dict[str, float]:
+    """Скользящие средние по последним 7/14/28 дням"""
+    window_28 = adj[-28:]
+    return {
+        'mean_7': float(np.mean(adj[-7:])),
+        'mean_14': float(np.mean(adj[-14:])),
+        'mean_28': float(np.mean(window_28)),
+        'std_28': float(np.std(window_28))
+    }
+
+
+def burnout_components(
+    tasks: np.ndarray,
+    streaks: np.ndarray,
+    ema_values: np.ndarray,
+    mean_28: float,
+    mean_7: float
+) -> Dict[str, float]:
+    """Компоненты индекса риска выгорания для последнего дня ряда"""
+    downshift = clip((mean_28 - mean_7) / mean_28, 0.0, 1.0) if mean_28 > 1.0 else 0.0
+
+    momentum = 0.0
+    if ema_values.size >= 2 and ema_values[-2] > 1.0:
+        momentum = clip((ema_values[-2] - ema_values[-1]) / ema_values[-2], 0.0, 1.0)
+
+    zeros_rate = np.count_nonzero(tasks[-7:] == 0) / 7.0
+    streak_strain = sigmoid(0.35 * (int(streaks[-1]) - 7))
+
+    return {
+        'downshift': float(downshift),
+        'momentum': float(momentum),
+        'zeros_rate': float(zeros_rate),
+        'streak_strain': float(streak_strain)
+    }
+
+
+def compute_metrics(series: DailySeries) -> Dict:
+    """
+    Вычисление всех метрик продуктивности по дневному ряду
+    Формат результата совпадает с calculate_productivity_metrics
+    """
+    if series.dates.size == 0:
+        return {
+            'weekday_productivity': {},
+            'top_weekdays': [],
+            'adj_tasks': [],
+            'factors': {},
+            'moving_averages': {},
+            'ema_values': [],
+            'z_score': 0.0
+        }
+
+    weekday = weekdays(series.dates)
+    means = weekday_means(series.tasks, weekday)
+    factors = seasonal_factors(series.tasks, means)
+    adj = series.tasks / factors[weekday]
+
+    moving_avgs = moving_averages(adj)
+    ema_values = ema(adj)
+    z_score = calculate_z_score(adj[-1], moving_avgs['mean_28'], moving_avgs['std_28'])
+
+    components = burnout_components(
+        series.tasks,
+        series.streaks,
+        ema_values,
+        moving_avgs['mean_28'],
+        moving_avgs['mean_7']
+    )
+    risk_index, risk_category = calculate_burnout_risk_index(components)
+
+    # Стабильная сортировка по убыванию, как sorted(..., reverse=True)
+    top = np.argsort(-means, kind='stable')[:2]
+
+    return {
+        'weekday_productivity': {str(w): float(m) for w, m in enumerate(means.tolist())},
+        'top_weekdays': [{'weekday': int(w), 'mean_tasks': float(means[w])} for w in top],
+        'adj_tasks': adj.tolist(),
+        'factors': {str(w): f for w, f in enumerate(factors.tolist())},
+        'moving_averages': moving_avgs,
+        'ema_values': ema_values.tolist(),
+        'z_score': float(z_score),
+        'burnout_risk': {
+            'index': risk_index,
+            'category': risk_category,
+            'components': components
+        },
+        'dates': series.dates.astype(str).tolist(),
+        'tasks_raw': series.tasks.tolist(),
+        'streaks': series.streaks.tolist()
+    }
@@ -0,0 +1,79 @@
+"""
+Пул процессов для вычисления метрик продуктивности
+
+Синхронные обработчики аналитики выполняются в общем threadpool Starlette,
+и NumPy-вычисления вместе со сборкой словарей держат GIL, задерживая CRUD-запросы.
+В режиме пула (settings.ANALYTICS_POOL_WORKERS > 0) конвейер выполняется
+в отдельных процессах: поток обработчика только ждет результат.
+В процесс передаются массивы DailySeries, а не ORM-объекты.
+Очередь ограничена settings.ANALYTICS_POOL_QUEUE заданиями; при переполнении
+выбрасывается AnalyticsBusyError.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from threading import BoundedSemaphore
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.analytics.engine import DailySeries, compute_metrics
+
+
+class AnalyticsBusyError(Exception):
+    """Очередь пула аналитики заполнена"""
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_slots: Optional[BoundedSemaphore] = None
+
+
+def _compute(dates: np.ndarray, tasks: np.ndarray, streaks: np.ndarray) -> Dict:
+    """Точка входа в рабочем процессе"""
+    return compute_metrics(DailySeries(dates, tasks, streaks))
+
+
+def _warm_up() -> int:
+    """Прогрев процесса: импорт модулей и первый прогон конвейера"""
+    n = 28
+    _compute(
+        np.datetime64('2024-01-01') + np.arange(n),
+        np.ones(n, dtype=np.int32),
+        np.arange(1, n + 1, dtype=np.int32)
+    )
+    return 0
+
+
+def start_pool(workers: int, queue_size: int) -> None:
+    """Запустить и прогреть пул процессов (no-op при workers <= 0)"""
+    global _executor, _slots
+    if workers <= 0 or _executor is not None:
+        return
+    # spawn: рабочие процессы не наследуют потоки и соединения с БД родителя
+    _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    _slots = BoundedSemaphore(max(queue_size, workers))
+    for future in [_executor.submit(_warm_up) for _ in range(workers)]:
+        future.result()
+
+
+def shutdown_pool() -> None:
+    """Остановить пул процессов"""
+    global _executor, _slots
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+    _executor = None
+    _slots = None
+
+
+def run_metrics(series: DailySeries) -> Dict:
+    """
+    Вычислить метрики: в пуле процессов, если он запущен, иначе в текущем потоке
+    """
+    executor, slots = _executor, _slots
+    if executor is None:
+        return compute_metrics(series)
+    if not slots.acquire(blocking=False):
+        raise AnalyticsBusyError()
+    try:
+        return executor.submit(_compute, series.dates, series.tasks, series.streaks).result()
+    finally:
+        slots.release()
@@ -306,80 +306,10 @@ def get_top_weekdays(weekday_means: Dict[int, float], top_n: int = 2) -> List[Tu
 def calculate_productivity_metrics(daily_data: List[Dict]) -> Dict:
     """
     Основная функция для вычисления всех метрик продуктивности
+    Вычисления выполняет колоночный движок app.analytics.engine
     """
-    # Очистка данных
-    cleaned_data = clean_data(daily_data)
-    
-    if not cleaned_data:
-        return {
-            'weekday_productivity': {},
-            'top_weekdays': [],
-            'adj_tasks': [],
-            'factors': {},
-            'moving_averages': {},
-            'ema_values': [],
-            'z_score': 0.0
-        }
-    
-    # Извлечение данных
-    dates = [r['date'] for r in cleaned_data]
-    tasks_raw = [r.get('tasks_done', 0) for r in cleaned_data]
-    streaks = [r.get('streak', 0) for r in cleaned_data]
-    
-    # 1. Продуктивность по дням недели
-    weekday_means = calculate_weekday_productivity(cleaned_data)
-    
-    # 2. Нормализация сезонности
-    adj_tasks, factors = normalize_seasonality(cleaned_data, weekday_means)
-    
-    # 3. Скользящие средние
-    moving_avgs = calculate_moving_averages(adj_tasks)
-    
-    # 4. EMA
-    ema_values = calculate_ema(adj_tasks, alpha=0.25)
-    
-    # 5. Z-score для последнего дня
-    z_score = 0.0
-    if adj_tasks:
-        z_score = calculate_z_score(
-            adj_tasks[-1],
-            moving_avgs['mean_28'],
-            moving_avgs['std_28']
-        )
-    
-    # 6. Компоненты риска выгорания
-    components = calculate_burnout_components(
-        adj_tasks,
-        tasks_raw,
-        streaks,
-        ema_values,
-        moving_avgs['mean_28'],
-        moving_avgs['mean_7']
-    )
-    
-    # 7. Индекс риска выгорания
-    risk_index, risk_category = calculate_burnout_risk_index(components)
-    
-    # 8. ТОП-дни недели
-    top_weekdays = get_top_weekdays(weekday_means, top_n=2)
-    
-    return {
-        'weekday_productivity': {str(k): float(v) for k, v in weekday_means.items()},
-        'top_weekdays': [{'weekday': w, 'mean_tasks': float(m)} for w, m in top_weekdays],
-        'adj_tasks': [float(x) for x in adj_tasks],
-        'factors': {str(k): float(v) for k, v in factors.items()},
-        'moving_averages': moving_avgs,
-        'ema_values': [float(x) for x in ema_values],
-        'z_score': float(z_score),
-        'burnout_risk': {
-            'index': risk_index,
-            'category': risk_category,
-            'components': components
-        },
-        'dates': [d.isoformat() if isinstance(d, (datetime, date)) else str(d) for d in dates],
-        'tasks_raw': tasks_raw,
-        'streaks': streaks
-    }
+    from app.analytics.engine import build_series, compute_metrics
+    return compute_metrics(build_series(daily_data))
 
 
 def calculate_burnout_risk(daily_data: List[Dict]) -> Dict:
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, Request, Response
 from sqlalchemy.orm import Session
 from datetime import datetime, date, timedelta
 from typing import List
@@ -7,6 +7,8 @@ from app.database import get_db, Base, engine
 from app.models.achievements import Achievement, UserAchievement
 from app.models.user import User
 from app.schemas.achievements import AchievementOut
+from app.crud.user import bump_collection_version
+from app.deps import collection_etag, not_modified
 
 router = APIRouter()
 
@@ -75,6 +77,7 @@ def handle_user_login(user, db):
     return user
 
 def check_achievements(user: User, db: Session) -> None:
+    changed = False
     for ach in db.query(Achievement).all():
         cond_attr = ach.condition_type
         value = getattr(user, cond_attr, None)
@@ -84,9 +87,13 @@ def check_achievements(user: User, db: Session) -> None:
         if not ua:
             ua = UserAchievement(user_id=user.id, achievement_id=ach.id)
             db.add(ua)
+            changed = True
         if not ua.unlocked and value >= ach.condition_value:
             ua.unlocked = True
             ua.unlocked_at = datetime.now()
+            changed = True
+    if changed:
+        bump_collection_version(db, user.id)
     db.commit()
 
 
@@ -131,10 +138,11 @@ def get_all_achievements(db: Session = Depends(get_db)):
 
 
 @router.get("/users/{user_id}", response_model=List[AchievementOut])
-def get_user_achievements(user_id: int, db: Session = Depends(get_db)):
+def get_user_achievements(user_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         return []
+    not_modified(request, response, collection_etag(user))
     ua_list = db.query(UserAchievement).filter(UserAchievement.user_id == user.id).all()
     result = []
     for ua in ua_list:
@@ -1,25 +1,41 @@
 """
 API endpoints для аналитики продуктивности
 """
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+import numpy as np
 
 from app.database.base import get_db
 from app.models.user import User
-from app.deps import get_current_active_user
+from app.deps import get_current_active_user, get_current_superuser
 from app.crud import analytics as crud_analytics
-from app.analytics import calculate_productivity_metrics, get_top_weekdays
+from app.analytics import get_top_weekdays
+from app.analytics.pool import run_metrics, AnalyticsBusyError
+from app.analytics.cache import metrics_cache, metrics_flight
+from app.analytics.history import risk_history
 from app.schemas.analytics import (
     ProductivityMetrics,
     AnalyticsDashboard,
     ProductivityRecommendation,
     BurnoutWarning,
-    TopWeekday
+    TopWeekday,
+    RiskSnapshot,
+    CohortScoringResult,
+    RiskHistoryPoint,
+    BurnoutComponents,
+    MetricsCacheStats,
+    ProductivityTrend,
+    TrendPoint
 )
 
 router = APIRouter()
 
+# Числовые ряды ProductivityMetrics, параллельные списку dates
+SERIES_FIELDS = ("adj_tasks", "ema_values", "tasks_raw", "streaks")
+
 # Названия дней недели
 WEEKDAY_NAMES = {
     0: "Понедельник",
@@ -41,7 +57,7 @@ def format_recommendation(top_weekdays_data: list) -> ProductivityRecommendation
             suggestion="Продолжайте работать, чтобы получить рекомендации"
         )
     
-    top_days = [WEEKDAY_NAMES.get(w['weekday'], f"День {w['weekday']}") for w in top_weekdays_data]
+    top_days = [WEEKDAY_NAMES.get(w.weekday, f"День {w.weekday}") for w in top_weekdays_data]
     
     if len(top_days) == 1:
         suggestion = f"Планируйте сложные задачи на {top_days[0]}"
@@ -85,26 +101,28 @@ def format_burnout_warning(risk_category: str, risk_index: float) -> Optional[Bu
     )
 
 
-@router.get("/metrics", response_model=ProductivityMetrics)
-def get_productivity_metrics(
-    days_back: int = 60,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
+def compute_productivity_metrics(db: Session, user_id: int, days_back: int) -> ProductivityMetrics:
     """
-    Получить метрики продуктивности
+    Вычислить метрики продуктивности пользователя (без кэша)
     """
     # Получаем данные по дням
-    daily_data = crud_analytics.get_daily_tasks_data(db, user_id=current_user.id, days_back=days_back)
+    series = crud_analytics.get_daily_series(db, user_id=user_id, days_back=days_back)
     
-    if not daily_data:
+    if series.dates.size == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Недостаточно данных для анализа. Нужно минимум несколько дней активности."
         )
     
-    # Вычисляем метрики
-    metrics_dict = calculate_productivity_metrics(daily_data)
+    # Вычисляем метрики (в пуле процессов, если он включен)
+    try:
+        metrics_dict = run_metrics(series)
+    except AnalyticsBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics is busy, try again later",
+            headers={"Retry-After": "1"}
+        )
     
     # Преобразуем в схему
     from app.schemas.analytics import BurnoutComponents, BurnoutRisk, MovingAverages, TopWeekday
@@ -131,9 +149,117 @@ def get_productivity_metrics(
     )
 
 
+def get_cached_metrics(db: Session, user: User, days_back: int) -> ProductivityMetrics:
+    """
+    Метрики продуктивности из кэша (вычисляются при промахе)
+    """
+    # Окно заканчивается сегодняшним днем, поэтому дата тоже входит в ключ
+    key = (user.id, days_back, user.data_version, datetime.utcnow().date())
+    metrics = metrics_cache.get(key)
+    if metrics is None:
+        def compute() -> ProductivityMetrics:
+            result = compute_productivity_metrics(db, user.id, days_back)
+            metrics_cache.set(key, result)
+            return result
+        # Параллельные запросы дашборда ждут одно вычисление вместо своих
+        metrics = metrics_flight.do(key, compute)
+    return metrics
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Разбор параметра ?fields=a,b,c с проверкой имен полей ProductivityMetrics"""
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in ProductivityMetrics.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return names
+
+
+def encode_metrics_binary(metrics: ProductivityMetrics, fields: Optional[List[str]]) -> Response:
+    """
+    Упаковка числовых рядов в little-endian float32 подряд, в порядке fields.
+    Описание раскладки - в заголовках X-Series-*
+    """
+    names = fields or list(SERIES_FIELDS)
+    not_series = [name for name in names if name not in SERIES_FIELDS]
+    if not_series:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Binary encoding supports only series fields: {', '.join(SERIES_FIELDS)}"
+        )
+    body = b''.join(np.asarray(getattr(metrics, name), dtype='<f4').tobytes() for name in names)
+    return Response(
+        content=body,
+        media_type="application/octet-stream",
+        headers={
+            "X-Series-Start": metrics.dates[0] if metrics.dates else "",
+            "X-Series-Step-Days": "1",
+            "X-Series-Length": str(len(metrics.dates)),
+            "X-Series-Fields": ",".join(names),
+        }
+    )
+
+
+def encode_metrics_json(metrics: ProductivityMetrics, fields: Optional[List[str]], compact: bool) -> Response:
+    """
+    JSON с выбранными полями; в компактном виде список dates заменяется
+    на series_start + series_step_days + series_length
+    """
+    names = fields or list(ProductivityMetrics.model_fields)
+    content = metrics.model_dump(mode='json', include=set(names))
+    if compact and 'dates' in content:
+        dates = content.pop('dates')
+        content['series_start'] = dates[0] if dates else None
+        content['series_step_days'] = 1
+        content['series_length'] = len(dates)
+    return JSONResponse(content=content)
+
+
+@router.get("/metrics", response_model=ProductivityMetrics)
+def get_productivity_metrics(
+    days_back: int = Query(60, ge=0),
+    fields: Optional[str] = Query(None, description="Список полей через запятую"),
+    encoding: str = Query("list", pattern="^(list|compact|binary)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Получить метрики продуктивности
+
+    encoding=list - полный ответ, compact - без списка дат (начало + шаг),
+    binary - только числовые ряды в виде float32
+    """
+    selected = parse_fields(fields)
+    metrics = get_cached_metrics(db, current_user, days_back)
+    if encoding == "binary":
+        return encode_metrics_binary(metrics, selected)
+    if encoding == "compact" or selected is not None:
+        return encode_metrics_json(metrics, selected, compact=encoding == "compact")
+    return metrics
+
+
+@router.get("/metrics/cache", response_model=MetricsCacheStats)
+def get_metrics_cache_stats(current_user: User = Depends(get_current_superuser)):
+    """
+    Счетчики кэша метрик и объединения одновременных вычислений
+    """
+    return MetricsCacheStats(
+        cache_size=len(metrics_cache),
+        cache_hits=metrics_cache.hits,
+        cache_misses=metrics_cache.misses,
+        computations=metrics_flight.computations,
+        coalesced=metrics_flight.coalesced
+    )
+
+
 @router.get("/dashboard", response_model=AnalyticsDashboard)
 def get_analytics_dashboard(
-    days_back: int = 60,
+    days_back: int = Query(60, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -141,7 +267,7 @@ def get_analytics_dashboard(
     Получить полный дашборд аналитики с рекомендациями и предупреждениями
     """
     # Получаем метрики
-    metrics = get_productivity_metrics(days_back=days_back, db=db, current_user=current_user)
+    metrics = get_cached_metrics(db, current_user, days_back)
     
     # Формируем рекомендацию
     recommendation = format_recommendation(metrics.top_weekdays)
@@ -158,7 +284,7 @@ def get_analytics_dashboard(
 
 @router.get("/risk", response_model=BurnoutWarning)
 def get_burnout_risk(
-    days_back: int = 60,
+    days_back: int = Query(60, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -166,7 +292,7 @@ def get_burnout_risk(
     Получить информацию о риске выгорания
     """
     # Получаем метрики
-    metrics = get_productivity_metrics(days_back=days_back, db=db, current_user=current_user)
+    metrics = get_cached_metrics(db, current_user, days_back)
     
     # Формируем предупреждение
     warning = format_burnout_warning(metrics.burnout_risk.category, metrics.burnout_risk.index)
@@ -182,9 +308,71 @@ def get_burnout_risk(
     return warning
 
 
+@router.get("/risk/history", response_model=List[RiskHistoryPoint])
+def get_burnout_risk_history(
+    days_back: int = Query(60, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Получить индекс риска выгорания и его компоненты на каждый день окна
+    """
+    series = crud_analytics.get_daily_series(db, user_id=current_user.id, days_back=days_back)
+    history = risk_history(series)
+
+    dates = series.dates.astype(str).tolist()
+    columns = {name: values.tolist() for name, values in history.items()}
+    return [
+        RiskHistoryPoint(
+            date=day,
+            index=columns['index'][i],
+            category=columns['category'][i],
+            z_score=columns['z_score'][i],
+            components=BurnoutComponents(
+                downshift=columns['downshift'][i],
+                momentum=columns['momentum'][i],
+                zeros_rate=columns['zeros_rate'][i],
+                streak_strain=columns['streak_strain'][i]
+            )
+        )
+        for i, day in enumerate(dates)
+    ]
+
+
+@router.get("/trend", response_model=ProductivityTrend)
+def get_productivity_trend(
+    days_back: int = Query(365, ge=0),
+    granularity: Optional[str] = Query(None, pattern="^(day|week|month|quarter|year)$"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Получить тренд выполненных задач по дням, неделям, месяцам, кварталам или годам
+    Без granularity выбирается самая мелкая, дающая не больше 120 точек
+    """
+    if granularity is None:
+        granularity = crud_analytics.choose_trend_granularity(days_back)
+    periods = crud_analytics.get_productivity_trend(
+        db, user_id=current_user.id, days_back=days_back, granularity=granularity
+    )
+    return ProductivityTrend(
+        granularity=granularity,
+        source=crud_analytics.TREND_SOURCE[granularity],
+        points=[
+            TrendPoint(
+                period_start=p['period_start'],
+                days=p['days'],
+                tasks_done=p['tasks_done'],
+                mean_per_day=p['tasks_done'] / p['days']
+            )
+            for p in periods
+        ]
+    )
+
+
 @router.get("/recommendations", response_model=ProductivityRecommendation)
 def get_recommendations(
-    days_back: int = 60,
+    days_back: int = Query(60, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -192,8 +380,41 @@ def get_recommendations(
     Получить рекомендации по продуктивности
     """
     # Получаем метрики
-    metrics = get_productivity_metrics(days_back=days_back, db=db, current_user=current_user)
+    metrics = get_cached_metrics(db, current_user, days_back)
     
     # Формируем рекомендацию
     return format_recommendation(metrics.top_weekdays)
 
+
+@router.post("/risk/cohort", response_model=CohortScoringResult)
+def score_cohort_risk(
+    days_back: int = Query(60, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser)
+):
+    """
+    Пакетно посчитать риск выгорания для всех пользователей и сохранить снимок
+    """
+    users_scored = crud_analytics.score_cohort_risk(db, days_back=days_back)
+    return CohortScoringResult(
+        snapshot_date=datetime.utcnow().date(),
+        days_back=days_back,
+        users_scored=users_scored
+    )
+
+
+@router.get("/risk/cohort", response_model=List[RiskSnapshot])
+def get_cohort_risk(
+    snapshot_date: Optional[date] = None,
+    category: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_superuser)
+):
+    """
+    Получить снимок риска выгорания по когорте (по умолчанию - последний)
+    """
+    return crud_analytics.get_risk_snapshots(
+        db, snapshot_date=snapshot_date, category=category, skip=skip, limit=limit
+    )
@@ -1,26 +1,35 @@
 """
 API endpoints для списков задач
 """
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.database.base import get_db
 from app.models.user import User
-from app.schemas.list import TaskList, TaskListCreate, TaskListUpdate
+from app.schemas.list import TaskList, TaskListBulkRequest, TaskListBulkResult, TaskListCreate, TaskListUpdate
 from app.schemas.task import Task as TaskSchema
 from app import crud
-from app.deps import get_current_active_user
+from app.deps import check_collection_etag, get_current_active_user
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[TaskList])
-def get_lists(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+@router.get("/", response_model=List[TaskList], dependencies=[Depends(check_collection_etag)])
+def get_lists(response: Response, skip: int = 0, limit: int = Query(100, ge=1), cursor: Optional[str] = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     """
     Получить список всех списков задач текущего пользователя
+    Курсор следующей страницы - в заголовке X-Next-Cursor (skip > 0 - старая пагинация через OFFSET)
     """
-    return crud.get_lists(db, user_id=current_user.id, skip=skip, limit=limit)
+    if skip:
+        return crud.get_lists(db, user_id=current_user.id, skip=skip, limit=limit)
+    try:
+        lists, next_cursor = crud.get_lists_page(db, user_id=current_user.id, limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return lists
 
 
 @router.post("/", response_model=TaskList, status_code=status.HTTP_201_CREATED)
@@ -37,7 +46,7 @@ def create_list(task_list: TaskListCreate, db: Session = Depends(get_db), curren
     return crud.create_list(db=db, name=task_list.name, creator_id=current_user.id)
 
 
-@router.get("/{list_id}", response_model=TaskList)
+@router.get("/{list_id}", response_model=TaskList, dependencies=[Depends(check_collection_etag)])
 def get_list(list_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     """
     Получить список по ID (только если вы его создали)
@@ -72,7 +81,7 @@ def delete_list(list_id: int, db: Session = Depends(get_db), current_user: User
 # --- endpoints to manage tasks in a list ---
 
 
-@router.get("/{list_id}/tasks", response_model=List[TaskSchema])
+@router.get("/{list_id}/tasks", response_model=List[TaskSchema], dependencies=[Depends(check_collection_etag)])
 def get_tasks_in_list(list_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     """
     Получить задачи (корневые) в списке (только если вы создатель списка)
@@ -89,20 +98,38 @@ def add_task_to_list(list_id: int, task_id: int, db: Session = Depends(get_db),
     Добавить корневую задачу в список (body/query: task_id как int) только для создателя списка
     """
     added = crud.add_task_to_list(db=db, list_id=list_id, task_id=task_id, user_id=current_user.id)
+    if added is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
     if not added:
-        if crud.get_list(db, list_id=list_id, user_id=current_user.id) is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Could not add task to list")
     return {"detail": "Task added to list"}
 
 
+@router.post("/{list_id}/tasks/bulk", response_model=List[TaskListBulkResult])
+def bulk_update_list_tasks(list_id: int, bulk: TaskListBulkRequest, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+    """
+    Добавить (add), убрать (remove) или перенести в target_list_id (move) много корневых задач одним запросом
+    Результат - по каждому task_id; задачи, которые нельзя изменить, получают error = not_found
+    """
+    try:
+        results = crud.update_list_membership(
+            db=db, list_id=list_id, op=bulk.op, task_ids=bulk.task_ids,
+            user_id=current_user.id, target_list_id=bulk.target_list_id
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid target_list_id")
+    if results is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
+    return results
+
+
 @router.delete("/{list_id}/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def remove_task_from_list(list_id: int, task_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     """
     Удалить корневую задачу из списка (только создатель)
     """
-    if crud.get_list(db, list_id=list_id, user_id=current_user.id) is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
     removed = crud.remove_task_from_list(db=db, list_id=list_id, task_id=task_id, user_id=current_user.id)
+    if removed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="List not found")
     if not removed:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found in list")
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+API endpoints для дельта-синхронизации клиентов
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.database.base import get_db
+from app.models.user import User
+from app.schemas.sync import SyncChanges
+from app.crud.sync import SyncCursorExpired, get_changes
+from app.deps import get_current_active_user
+
+router = APIRouter()
+
+
+@router.get("/changes", response_model=SyncChanges)
+def changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=5000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Изменения задач и списков после курсора since (0 - полный снимок)
+    Следующий запрос - с since=cursor из ответа; пока has_more, есть еще страницы.
+    410 - курсор старше хранимого журнала, нужен запрос с since=0
+    """
+    try:
+        return get_changes(db, user_id=current_user.id, since=since, limit=limit)
+    except SyncCursorExpired:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync cursor expired, full resync required"
+        )
@@ -1,33 +1,67 @@
 """
 API endpoints для задач
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from app.database.base import get_db
 from app.models.user import User
-from app.schemas.task import Task, TaskCreate, TaskUpdate
+from app.schemas.task import (
+    Task, TaskBatchRequest, TaskBatchResult, TaskCreate, TaskMove, TaskSearchHit, TaskSummary, TaskTree, TaskUpdate
+)
 from app import crud
-from app.deps import get_current_active_user
+from app.crud.search import search_tasks
+from app.deps import check_collection_etag, get_current_active_user
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[Task])
+@router.get("/", response_model=Union[List[Task], List[TaskTree]], dependencies=[Depends(check_collection_etag)])
 def get_tasks(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    order_by: str = Query("created_at", pattern="^(created_at|due_date)$"),
     is_completed: Optional[bool] = None,
+    include: Optional[str] = Query(None, pattern="^subtree$"),
+    max_depth: Optional[int] = Query(None, ge=0),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Получить список задач текущего пользователя
+
+    Страницы курсорные: задачи идут в порядке (order_by, id), курсор следующей
+    страницы возвращается в заголовке X-Next-Cursor и передается в cursor.
+    skip > 0 - устаревшая пагинация через OFFSET (без заголовка).
+
+    include=subtree - только задачи верхнего уровня, каждая с вложенным
+    списком subtasks (max_depth ограничивает глубину)
     """
-    tasks = crud.get_tasks(db, user_id=current_user.id, skip=skip, limit=limit, 
-                          is_completed=is_completed)
-    return tasks
+    roots_only = include == "subtree"
+    next_cursor = None
+    if skip:
+        tasks = crud.get_tasks(db, user_id=current_user.id, skip=skip, limit=limit,
+                               is_completed=is_completed, roots_only=roots_only)
+    else:
+        try:
+            tasks, next_cursor = crud.get_tasks_page(
+                db, user_id=current_user.id, limit=limit, cursor=cursor, order_by=order_by,
+                is_completed=is_completed, roots_only=roots_only
+            )
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if roots_only:
+        forest = crud.get_task_forest(db, [t.id for t in tasks], current_user.id, max_depth)
+        return [TaskTree.model_validate(t) for t in forest]
+    # Явно в Task: иначе при проверке Union ORM-объект прочитал бы связь subtasks
+    return [Task.model_validate(t) for t in tasks]
 
 
 @router.post("/", response_model=Task, status_code=status.HTTP_201_CREATED)
@@ -51,7 +85,90 @@ def create_task(
     return db_task
 
 
-@router.get("/{task_id}", response_model=Task)
+@router.post("/batch", response_model=List[TaskBatchResult])
+def batch_tasks(
+    batch: TaskBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Применить пакет операций create/update/complete/delete в одной транзакции
+    Результат - по элементу на операцию; ошибочные операции пропускаются.
+    Повторный ref или parent_ref без более раннего create - 400, пакет не применяется
+    """
+    try:
+        return crud.apply_task_batch(db, batch.operations, user_id=current_user.id)
+    except ValueError as e:
+        if str(e) == 'duplicate_ref':
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Duplicate ref")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid parent_ref")
+
+
+@router.get("/summary", response_model=TaskSummary)
+def summary(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Счетчики задач для главного экрана: всего, открытых, просроченных,
+    выполненных сегодня - в целом, по приоритетам и по спискам
+    """
+    return crud.get_task_summary(db, user_id=current_user.id)
+
+
+@router.get("/agenda", response_model=List[Task])
+def agenda(
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    sort: str = Query("time", pattern="^(time|urgency)$"),
+    limit: int = Query(50, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Открытые задачи, запланированные или со сроком в окне [from, to)
+    По умолчанию окно - 7 дней с начала сегодняшнего дня (UTC).
+    sort=urgency - по срочности (приоритет + близость срока); без from/to -
+    самые срочные открытые задачи вообще, независимо от дат
+    """
+    if sort == "urgency" and start is None and end is None:
+        return crud.get_urgent_tasks(db, user_id=current_user.id, limit=limit)
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start is None:
+        start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    if end is None:
+        end = start + timedelta(days=7)
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'to' must be after 'from'")
+    if sort == "time":
+        return crud.get_agenda(db, user_id=current_user.id, start=start, end=end, limit=limit)
+    return crud.get_urgent_tasks(db, user_id=current_user.id, limit=limit, start=start, end=end)
+
+
+def _naive_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """Дата с часовым поясом -> наивная UTC (так хранятся даты задач)"""
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/search", response_model=List[TaskSearchHit], dependencies=[Depends(check_collection_etag)])
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(50, ge=1, le=200),
+    is_completed: Optional[bool] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Полнотекстовый поиск по названию и описанию задач текущего пользователя
+    Слова ищутся по префиксу, совпадения в названии важнее; найденное
+    выделено тегами <mark> в title_highlight и snippet
+    """
+    return search_tasks(db, user_id=current_user.id, q=q, limit=limit, is_completed=is_completed)
+
+
+@router.get("/{task_id}", response_model=Task, dependencies=[Depends(check_collection_etag)])
 def get_task(
     task_id: int,
     db: Session = Depends(get_db),
@@ -66,6 +183,22 @@ def get_task(
     return db_task
 
 
+@router.get("/{task_id}/tree", response_model=TaskTree, dependencies=[Depends(check_collection_etag)])
+def get_task_tree(
+    task_id: int,
+    max_depth: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Получить задачу со всеми подзадачами (одним запросом)
+    """
+    tree = crud.get_task_tree(db, task_id=task_id, user_id=current_user.id, max_depth=max_depth)
+    if tree is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return tree
+
+
 @router.put("/{task_id}", response_model=Task)
 def update_task(
     task_id: int,
@@ -88,6 +221,28 @@ def update_task(
     return db_task
 
 
+@router.post("/{task_id}/move", response_model=Task)
+def move_task(
+    task_id: int,
+    move: TaskMove,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Переставить задачу среди задач того же списка / подзадач того же родителя
+    (drag-and-drop): сразу после after_id и / или перед before_id, без них - в начало
+    """
+    try:
+        db_task = crud.move_task(
+            db=db, task_id=task_id, user_id=current_user.id, after_id=move.after_id, before_id=move.before_id
+        )
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid after_id / before_id")
+    if db_task is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return db_task
+
+
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(
     task_id: int,
@@ -95,7 +250,8 @@ def delete_task(
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Удалить задачу
+    Удалить задачу вместе с подзадачами
+    Задачи сразу скрываются из выдачи, строки удаляются фоновой очисткой
     """
     success = crud.delete_task(db=db, task_id=task_id, user_id=current_user.id)
     if not success:
@@ -115,3 +271,20 @@ def complete_task(
     if db_task is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
     return db_task
+
+
+@router.post("/{task_id}/clone", response_model=TaskTree, status_code=status.HTTP_201_CREATED)
+def clone_task(
+    task_id: int,
+    offset_days: int = Query(0, description="Сдвиг due_date и scheduled_date копий, дни"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Скопировать задачу со всеми подзадачами (например, план курса на новый семестр)
+    Копия создается рядом с оригиналом, не выполнена; возвращается дерево копии
+    """
+    clone_id = crud.clone_task(db=db, task_id=task_id, user_id=current_user.id, offset_days=offset_days)
+    if clone_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
+    return crud.get_task_tree(db, clone_id, current_user.id)
@@ -23,6 +23,23 @@ class Settings(BaseSettings):
     
     # Дополнительные настройки
     API_V1_STR: str = "/api/v1"
+
+    # Максимальное число записей в кэше метрик аналитики
+    METRICS_CACHE_SIZE: int = 1024
+
+    # Пул процессов для вычисления метрик (0 - считать в потоке обработчика)
+    ANALYTICS_POOL_WORKERS: int = 0
+    # Максимальное число заданий в пуле (выполняемых и ожидающих)
+    ANALYTICS_POOL_QUEUE: int = 64
+
+    # Сколько дней хранится журнал изменений для синхронизации клиентов
+    SYNC_RETENTION_DAYS: int = 30
+
+    # Период фонового обслуживания задач (очистка удаленных, перебалансировка
+    # ключей порядка), секунды (0 - не запускать)
+    TASK_MAINTENANCE_INTERVAL_SECONDS: int = 60
+    # Сколько задач удаляется одной транзакцией
+    TASK_PURGE_BATCH_SIZE: int = 500
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,92 @@
+"""
+Фоновое обслуживание задач
+
+DELETE /tasks/{id} только помечает поддерево задачи deleted_at и сразу
+отвечает, а перемещение задачи удлиняет ее ключ position. Поток
+обслуживания раз в settings.TASK_MAINTENANCE_INTERVAL_SECONDS удаляет
+помеченные строки пачками по settings.TASK_PURGE_BATCH_SIZE и
+перебалансирует группы с длинными ключами; каждая пачка и группа - в своей
+транзакции, чтобы не блокировать запись надолго. Там же журнал изменений
+для синхронизации сжимается до settings.SYNC_RETENTION_DAYS дней.
+"""
+import logging
+from threading import Event, Thread
+from typing import Optional
+
+from app.crud.position import rebalance_positions
+from app.crud.sync import compact_change_log
+from app.crud.task import purge_deleted_tasks
+from app.database.base import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Сколько групп перебалансируется за один проход
+REBALANCE_GROUPS_PER_RUN = 100
+
+_thread: Optional[Thread] = None
+_stop: Optional[Event] = None
+
+
+def purge_all(batch_size: int, stop: Optional[Event] = None) -> int:
+    """Удалять пачки, пока очередь не опустеет (или не придет stop). Возвращает число задач"""
+    purged = 0
+    db = SessionLocal()
+    try:
+        while stop is None or not stop.is_set():
+            count = purge_deleted_tasks(db, batch_size)
+            purged += count
+            if count < batch_size:
+                break
+    finally:
+        db.close()
+    return purged
+
+
+def rebalance_all(max_groups: Optional[int] = None) -> int:
+    """Перебалансировать ключи position (не больше max_groups групп). Возвращает число групп"""
+    db = SessionLocal()
+    try:
+        return rebalance_positions(db, max_groups)
+    finally:
+        db.close()
+
+
+def compact_all(retention_days: int) -> int:
+    """Удалить записи журнала изменений старше retention_days. Возвращает число записей"""
+    db = SessionLocal()
+    try:
+        return compact_change_log(db, retention_days)
+    finally:
+        db.close()
+
+
+def _run(interval: float, batch_size: int, retention_days: int, stop: Event) -> None:
+    while not stop.wait(interval):
+        try:
+            purge_all(batch_size, stop)
+            rebalance_all(REBALANCE_GROUPS_PER_RUN)
+            compact_all(retention_days)
+        except Exception:
+            logger.exception("task maintenance failed")
+
+
+def start_maintenance(interval: float, batch_size: int, retention_days: int) -> None:
+    """Запустить поток обслуживания (no-op при interval <= 0)"""
+    global _thread, _stop
+    if interval <= 0 or _thread is not None:
+        return
+    _stop = Event()
+    _thread = Thread(
+        target=_run, args=(interval, batch_size, retention_days, _stop), name="task-maintenance", daemon=True
+    )
+    _thread.start()
+
+
+def stop_maintenance() -> None:
+    """Остановить поток обслуживания (текущая пачка дописывается)"""
+    global _thread, _stop
+    if _thread is not None:
+        _stop.set()
+        _thread.join()
+    _thread = None
+    _stop = None
@@ -12,21 +12,32 @@ from .user import (
 from .task import (
     get_task,
     get_tasks,
+    get_tasks_page,
     create_task,
     update_task,
     delete_task,
-    complete_task
+    complete_task,
+    clone_task,
+    move_task,
+    get_task_tree,
+    get_task_forest,
+    get_agenda,
+    get_urgent_tasks,
+    get_task_summary
 )
+from .batch import apply_task_batch
 from .list import (
     get_list,
     get_lists,
+    get_lists_page,
     get_list_by_name,
     create_list,
     update_list,
     delete_list,
     get_tasks_in_list,
     add_task_to_list,
-    remove_task_from_list
+    remove_task_from_list,
+    update_list_membership
 )
 
 __all__ = [
@@ -38,17 +49,28 @@ __all__ = [
     "authenticate_user",
     "get_task",
     "get_tasks",
+    "get_tasks_page",
     "create_task",
     "update_task",
     "delete_task",
     "complete_task",
+    "clone_task",
+    "move_task",
+    "get_task_tree",
+    "get_task_forest",
+    "get_agenda",
+    "get_urgent_tasks",
+    "get_task_summary",
+    "apply_task_batch",
     "get_list",
     "get_lists",
+    "get_lists_page",
     "get_list_by_name",
     "create_list",
     "update_list",
     "delete_list",
     "get_tasks_in_list",
     "add_task_to_list",
-    "remove_task_from_list"
+    "remove_task_from_list",
+    "update_list_membership"
 ]
\ No newline at end of file
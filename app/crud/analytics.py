@@ -3,11 +3,18 @@ CRUD операции для аналитики
 """
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime, timedelta, date
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from collections import defaultdict
+import numpy as np
 
 from app.models.task import Task
+from app.models.user import User
+from app.models.stats import UserDailyStats, UserRiskSnapshot
+from app.crud.stats import get_daily_counts, get_period_counts, period_start, next_period_start
+from app.analytics.cohort import score_matrix, streak_matrix
+from app.analytics.engine import DailySeries
 
 
 def get_daily_tasks_data(
@@ -18,68 +25,111 @@ def get_daily_tasks_data(
     """
     Получить данные по выполненным задачам по дням
     Возвращает список словарей с ключами: date, tasks_done, streak
+
+    Данные читаются из rollup-таблицы user_daily_stats: не больше
+    days_back + 1 строк независимо от всей истории пользователя.
     """
     # Вычисляем начальную дату
     end_date = datetime.utcnow().date()
     start_date = end_date - timedelta(days=days_back)
-    
-    # Получаем все выполненные задачи пользователя за период
-    # Используем completed_at если есть, иначе created_at
-    tasks = db.query(Task).filter(
-        and_(
-            Task.owner_id == user_id,
-            Task.is_completed == True
-        )
-    ).all()
-    
-    # Группируем по датам завершения
-    daily_counts = defaultdict(int)
-    for task in tasks:
-        # Используем completed_at если есть, иначе created_at
-        if task.completed_at:
-            task_date = task.completed_at.date() if isinstance(task.completed_at, datetime) else task.completed_at
-        else:
-            task_date = task.created_at.date() if isinstance(task.created_at, datetime) else task.created_at
-        
-        # Фильтруем по периоду
-        if start_date <= task_date <= end_date:
-            daily_counts[task_date] += 1
-    
-    # Создаем список всех дней в периоде
+
+    daily_counts = get_daily_counts(db, user_id, start_date, end_date)
+
+    # Создаем список всех дней в периоде и вычисляем streak на момент каждого дня
     result = []
     current_date = start_date
     current_streak = 0
-    max_streak = 0
-    
-    # Проходим по всем дням и вычисляем streak
     while current_date <= end_date:
         tasks_done = daily_counts.get(current_date, 0)
-        
-        # Обновляем streak
-        if tasks_done > 0:
-            current_streak += 1
-            max_streak = max(max_streak, current_streak)
-        else:
-            current_streak = 0
-        
+        current_streak = current_streak + 1 if tasks_done > 0 else 0
         result.append({
             'date': current_date,
             'tasks_done': tasks_done,
             'streak': current_streak
         })
-        
         current_date += timedelta(days=1)
-    
-    # Теперь проходим еще раз, чтобы установить правильный streak для каждого дня
-    # (streak должен быть текущим на момент этого дня)
-    current_streak = 0
-    for i, record in enumerate(result):
-        if record['tasks_done'] > 0:
-            current_streak += 1
-        else:
-            current_streak = 0
-        record['streak'] = current_streak
-    
+
+    return result
+
+
+def get_daily_series(
+    db: Session,
+    user_id: int,
+    days_back: int = 60
+) -> DailySeries:
+    """
+    Тот же дневной ряд, что и get_daily_tasks_data, сразу в виде массивов
+    (без промежуточного словаря на каждый день)
+    """
+    end_date = datetime.utcnow().date()
+    start_date = end_date - timedelta(days=days_back)
+    n_days = max(days_back + 1, 0)
+
+    daily_counts = get_daily_counts(db, user_id, start_date, end_date)
+
+    tasks = np.zeros(n_days, dtype=np.int32)
+    if daily_counts:
+        index = np.fromiter(((day - start_date).days for day in daily_counts), dtype=np.int64, count=len(daily_counts))
+        tasks[index] = np.fromiter(daily_counts.values(), dtype=np.int32, count=len(daily_counts))
+    dates = np.datetime64(start_date, 'D') + np.arange(n_days)
+    return DailySeries(dates, tasks, streak_matrix(tasks[None, :])[0])
+
+
+# Уровень пирамиды статистики, из которого строится каждая гранулярность тренда
+TREND_SOURCE = {
+    "day": "day",
+    "week": "week",
+    "month": "month",
+    "quarter": "month",
+    "year": "month",
+}
+TREND_MAX_POINTS = 120
+
+
+def choose_trend_granularity(days_back: int) -> str:
+    """Самая мелкая гранулярность, при которой в окне не больше TREND_MAX_POINTS периодов"""
+    for granularity, days in (("day", 1), ("week", 7), ("month", 31), ("quarter", 92)):
+        if (days_back + 1) / days <= TREND_MAX_POINTS:
+            return granularity
+    return "year"
+
+
+def get_productivity_trend(
+    db: Session,
+    user_id: int,
+    days_back: int,
+    granularity: str
+) -> List[Dict]:
+    """
+    Количество выполненных задач по периодам за окно days_back
+    Окно выравнивается на начало периода. Данные читаются из самого крупного
+    уровня пирамиды, который не грубее запрошенной гранулярности, поэтому
+    стоимость - O(числа периодов), а не O(дней).
+    Возвращает список словарей: period_start, days, tasks_done
+    """
+    end_date = datetime.utcnow().date()
+    start_date = period_start(end_date - timedelta(days=days_back), granularity)
+
+    source = TREND_SOURCE[granularity]
+    if source == "day":
+        counts = get_daily_counts(db, user_id, start_date, end_date)
+    else:
+        counts = get_period_counts(db, user_id, source, start_date, end_date)
+
+    totals: Dict[date, int] = defaultdict(int)
+    for start, tasks_done in counts.items():
+        totals[period_start(start, granularity)] += tasks_done
+
+    result = []
+    current = start_date
+    while current <= end_date:
+        following = next_period_start(current, granularity)
+        result.append({
+            'period_start': current,
+            'days': (min(following, end_date + timedelta(days=1)) - current).days,
+            'tasks_done': totals.get(current, 0)
+        })
+        current = following
     return result
 
 
@@ -96,8 +146,110 @@ def get_completed_tasks_by_date_range(
         and_(
             Task.owner_id == user_id,
             Task.is_completed == True,
+            Task.deleted_at == None,
             func.date(Task.created_at) >= start_date,
             func.date(Task.created_at) <= end_date
         )
     ).order_by(Task.created_at).all()
 
+
+
+def get_completion_matrix(
+    db: Session,
+    days_back: int = 60
+) -> Tuple[np.ndarray, np.ndarray, date]:
+    """
+    Матрица выполненных задач пользователи x дни за окно days_back одним запросом
+    Возвращает (user_ids, matrix[int32], start_date); пользователи без задач -
+    нулевые строки
+    """
+    end_date = datetime.utcnow().date()
+    start_date = end_date - timedelta(days=days_back)
+
+    rows = db.query(User.id, UserDailyStats.day, UserDailyStats.tasks_done).outerjoin(
+        UserDailyStats,
+        and_(
+            UserDailyStats.user_id == User.id,
+            UserDailyStats.day >= start_date,
+            UserDailyStats.day <= end_date
+        )
+    ).all()
+
+    n = len(rows)
+    user_ids, user_index = np.unique(np.fromiter((r[0] for r in rows), dtype=np.int64, count=n), return_inverse=True)
+    day_index = np.fromiter(((r[1] - start_date).days if r[1] is not None else -1 for r in rows), dtype=np.int64, count=n)
+    counts = np.fromiter((r[2] or 0 for r in rows), dtype=np.int32, count=n)
+
+    matrix = np.zeros((len(user_ids), days_back + 1), dtype=np.int32)
+    present = day_index >= 0
+    matrix[user_index[present], day_index[present]] = counts[present]
+    return user_ids, matrix, start_date
+
+
+def save_risk_snapshot(
+    db: Session,
+    user_ids: np.ndarray,
+    scores: Dict[str, np.ndarray],
+    snapshot_date: date,
+    days_back: int
+) -> int:
+    """
+    Записать снимок риска выгорания (upsert по (user_id, snapshot_date), без commit)
+    """
+    if len(user_ids) == 0:
+        return 0
+    columns = ('risk_index', 'category', 'downshift', 'momentum', 'zeros_rate', 'streak_strain', 'z_score')
+    values = {name: scores[name].tolist() for name in columns}
+    now = datetime.utcnow()
+    rows = [
+        dict(
+            {name: values[name][i] for name in columns},
+            user_id=user_id,
+            snapshot_date=snapshot_date,
+            days_back=days_back,
+            created_at=now
+        )
+        for i, user_id in enumerate(user_ids.tolist())
+    ]
+    stmt = sqlite_insert(UserRiskSnapshot)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserRiskSnapshot.user_id, UserRiskSnapshot.snapshot_date],
+        set_={name: stmt.excluded[name] for name in columns + ('days_back', 'created_at')}
+    )
+    db.execute(stmt, rows)
+    return len(rows)
+
+
+def score_cohort_risk(db: Session, days_back: int = 60, chunk_size: int = 4096) -> int:
+    """
+    Посчитать риск выгорания для всех пользователей и сохранить в user_risk_snapshot
+    Возвращает количество записанных снимков
+    """
+    user_ids, matrix, start_date = get_completion_matrix(db, days_back=days_back)
+    snapshot_date = start_date + timedelta(days=days_back)
+    written = 0
+    for offset in range(0, len(user_ids), chunk_size):
+        scores = score_matrix(matrix[offset:offset + chunk_size], start_date)
+        written += save_risk_snapshot(db, user_ids[offset:offset + chunk_size], scores, snapshot_date, days_back)
+    db.commit()
+    return written
+
+
+def get_risk_snapshots(
+    db: Session,
+    snapshot_date: Optional[date] = None,
+    category: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[UserRiskSnapshot]:
+    """
+    Получить снимки риска за дату (по умолчанию - последнюю), по убыванию риска
+    """
+    if snapshot_date is None:
+        snapshot_date = db.query(func.max(UserRiskSnapshot.snapshot_date)).scalar()
+        if snapshot_date is None:
+            return []
+    query = db.query(UserRiskSnapshot).filter(UserRiskSnapshot.snapshot_date == snapshot_date)
+    if category is not None:
+        query = query.filter(UserRiskSnapshot.category == category)
+    return query.order_by(UserRiskSnapshot.risk_index.desc()).offset(skip).limit(limit).all()
@@ -0,0 +1,176 @@
+"""
+Пакетное применение операций над задачами (POST /tasks/batch)
+
+Все операции пакета выполняются в одной транзакции с одним commit.
+Задачи и списки, на которые ссылается пакет, загружаются заранее двумя
+запросами; подряд идущие create вставляются одним executemany.
+Ошибка в операции не прерывает пакет: операция пропускается, а в ее
+результате возвращается код ошибки; подзадачи, ссылающиеся через parent_ref
+на несозданную задачу, тоже пропускаются. Ошибки в самих ссылках (повторный
+ref, parent_ref без более раннего create с таким ref) отклоняют пакет целиком
+до применения операций.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.list import TaskList
+from app.models.task import Task
+from app.schemas.task import TaskBatchOperation
+from app.crud import closure
+from app.crud.position import Group, key_between, next_position
+from app.crud.task import LIVE_TASK, apply_task_update, remove_task, set_subtree_completed
+from app.crud.user import bump_data_version
+
+
+def _prefetch(db: Session, operations: List[TaskBatchOperation],
+              user_id: int) -> Tuple[Dict[int, Task], Set[int]]:
+    """Задачи и списки пользователя, на которые ссылаются операции"""
+    task_ids, list_ids = set(), set()
+    for op in operations:
+        if op.task_id is not None:
+            task_ids.add(op.task_id)
+        payload = op.task if op.op == 'create' else op.changes
+        if payload is not None:
+            if payload.parent_id is not None:
+                task_ids.add(payload.parent_id)
+            if payload.task_list_id is not None:
+                list_ids.add(payload.task_list_id)
+    tasks = {}
+    if task_ids:
+        tasks = {t.id: t for t in db.query(Task).filter(Task.id.in_(task_ids), Task.owner_id == user_id, LIVE_TASK)}
+    lists = set()
+    if list_ids:
+        lists = set(db.execute(
+            select(TaskList.id).where(TaskList.id.in_(list_ids), TaskList.creator_id == user_id)
+        ).scalars())
+    return tasks, lists
+
+
+def _check_refs(operations: List[TaskBatchOperation]) -> None:
+    """
+    ValueError('duplicate_ref') - ref повторяется; ValueError('invalid_parent_ref') -
+    parent_ref не объявлен ref в более ранней операции create или задан вместе с parent_id
+    """
+    defined: Set[str] = set()
+    for op in operations:
+        if op.op != 'create':
+            continue
+        if op.parent_ref is not None and (
+            op.parent_ref not in defined or (op.task is not None and op.task.parent_id is not None)
+        ):
+            raise ValueError('invalid_parent_ref')
+        if op.ref is not None:
+            if op.ref in defined:
+                raise ValueError('duplicate_ref')
+            defined.add(op.ref)
+
+
+def _create_row(op: TaskBatchOperation, tasks: Dict[int, Task], lists: Set[int],
+                refs: Dict[str, int], user_id: int) -> Dict:
+    """Строка для INSERT по операции create (с проверкой родителя и списка)"""
+    if op.task is None:
+        raise ValueError('invalid_operation')
+    data = op.task
+    parent_id: Optional[int] = data.parent_id
+    if op.parent_ref is not None:
+        if parent_id is not None or op.parent_ref not in refs:
+            raise ValueError('invalid_parent')
+        parent_id = refs[op.parent_ref]
+    elif parent_id is not None and (parent_id not in tasks or tasks[parent_id].deleted_at is not None):
+        raise ValueError('invalid_parent')
+    # Subtasks cannot have a TaskList
+    task_list_id = data.task_list_id if parent_id is None else None
+    if task_list_id is not None and task_list_id not in lists:
+        raise ValueError('invalid_list')
+    return {
+        'title': data.title,
+        'description': data.description,
+        'due_date': data.due_date,
+        'scheduled_date': data.scheduled_date,
+        'priority': data.priority,
+        'owner_id': user_id,
+        'parent_id': parent_id,
+        'task_list_id': task_list_id,
+        'is_completed': False
+    }
+
+
+def apply_task_batch(db: Session, operations: List[TaskBatchOperation], user_id: int) -> List[Dict]:
+    """
+    Применить пакет операций пользователя
+    Возвращает результаты в порядке операций: index, op, ok, task_id, ref, error
+    ValueError (см. _check_refs) - ссылки пакета некорректны, ничего не применено
+    """
+    _check_refs(operations)
+    tasks, lists = _prefetch(db, operations, user_id)
+    results: List[Dict] = []
+    refs: Dict[str, int] = {}
+    pending: List[Tuple[Dict, Dict]] = []  # (результат, строка) еще не вставленных create
+    last_positions: Dict[Group, str] = {}  # последний выданный ключ position по группам
+
+    def insert_pending():
+        if not pending:
+            return
+        ids = db.execute(
+            insert(Task).returning(Task.id, sort_by_parameter_order=True),
+            [row for _, row in pending]
+        ).scalars().all()
+        closure.add_task_nodes(db, [(task_id, row['parent_id']) for task_id, (_, row) in zip(ids, pending)])
+        children = [task_id for task_id, (_, row) in zip(ids, pending) if row['parent_id'] is not None]
+        if children:
+            closure.count_into_ancestors(db, children, Task.descendant_count)
+        for task_id, (result, _) in zip(ids, pending):
+            result['task_id'] = task_id
+            if result['ref'] is not None:
+                refs[result['ref']] = task_id
+        pending.clear()
+
+    for index, op in enumerate(operations):
+        result = {'index': index, 'op': op.op, 'ok': True, 'task_id': op.task_id, 'ref': op.ref, 'error': None}
+        results.append(result)
+        try:
+            if op.op == 'create':
+                # Родитель из этого же пакета должен получить id до вставки подзадачи
+                if op.parent_ref is not None and op.parent_ref not in refs:
+                    insert_pending()
+                row = _create_row(op, tasks, lists, refs, user_id)
+                group = (user_id, row['parent_id'], row['task_list_id'])
+                if group in last_positions:
+                    row['position'] = key_between(last_positions[group], None)
+                else:
+                    row['position'] = next_position(db, group)
+                last_positions[group] = row['position']
+                pending.append((result, row))
+                continue
+
+            insert_pending()
+            # update может переместить задачу в конец группы - ключи читаются заново
+            last_positions.clear()
+            db_task = tasks.get(op.task_id)
+            # Подзадачи, удаленные ранее в пакете вместе с родителем, помечены deleted_at
+            if db_task is None or db_task.deleted_at is not None:
+                raise ValueError('not_found')
+            if op.op == 'update':
+                if op.changes is None:
+                    raise ValueError('invalid_operation')
+                changes = op.changes.model_dump(exclude_unset=True)
+                if changes.get('task_list_id') is not None and changes['task_list_id'] not in lists:
+                    raise ValueError('invalid_list')
+                apply_task_update(db, db_task, changes, user_id)
+            elif op.op == 'complete':
+                set_subtree_completed(db, db_task.id, user_id, True)
+            else:
+                remove_task(db, db_task, user_id)
+            db.flush()
+        except ValueError as e:
+            result.update(ok=False, error=str(e))
+            if op.op == 'create':
+                result['task_id'] = None
+
+    insert_pending()
+    if any(result['ok'] for result in results):
+        bump_data_version(db, user_id)
+    db.commit()
+    return results
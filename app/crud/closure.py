@@ -0,0 +1,251 @@
+"""
+Поддержка таблицы замыкания иерархии задач (task_closure)
+
+Каждая операция над деревом - один индексированный запрос к task_closure
+вместо рекурсивного обхода по parent_id. Функции не делают commit:
+вызываются из app/crud/task.py в транзакции изменения задачи.
+
+Здесь же поддерживаются счетчики прогресса Task.descendant_count и
+Task.descendant_completed_count: изменение дерева прибавляет дельты
+предкам одним UPDATE по task_closure.
+"""
+from typing import List, Optional, Tuple, Union
+
+from sqlalchemy import Integer, Select, bindparam, delete, func, insert, literal, or_, select, true, update
+from sqlalchemy.orm import Session, aliased
+
+from app.models.task import Task, TaskClosure
+
+
+def subtree_ids(task_id: int):
+    """Подзапрос с id задачи и всех ее потомков"""
+    return select(TaskClosure.descendant_id).where(TaskClosure.ancestor_id == task_id)
+
+
+def ancestor_ids(task_id: int):
+    """Подзапрос с id задачи и всех ее предков"""
+    return select(TaskClosure.ancestor_id).where(TaskClosure.descendant_id == task_id)
+
+
+def is_in_subtree(db: Session, task_id: int, node_id: int) -> bool:
+    """Является ли node_id самой задачей task_id или ее потомком"""
+    return db.execute(
+        select(literal(1)).where(
+            TaskClosure.ancestor_id == task_id,
+            TaskClosure.descendant_id == node_id
+        )
+    ).first() is not None
+
+
+def count_subtree(db: Session, task_id: int, completed: Optional[bool] = None) -> int:
+    """Число потомков задачи (без нее самой), completed - фильтр по выполнению"""
+    query = select(func.count()).select_from(TaskClosure).join(
+        Task, Task.id == TaskClosure.descendant_id
+    ).where(
+        TaskClosure.ancestor_id == task_id, TaskClosure.depth > 0, Task.deleted_at == None
+    )
+    if completed is not None:
+        query = query.where(Task.is_completed == completed)
+    return db.execute(query).scalar()
+
+
+def subtree_counts(db: Session, task_id: int) -> Tuple[int, int]:
+    """Число неудаленных задач поддерева (включая саму задачу) и выполненных из них"""
+    total, completed = db.execute(
+        select(func.count(), func.count().filter(Task.is_completed == True)).where(
+            Task.id.in_(subtree_ids(task_id)), Task.deleted_at == None
+        )
+    ).one()
+    return total, completed
+
+
+def shift_ancestor_counts(db: Session, task_id: int, total: int, completed: int) -> None:
+    """Прибавить (total, completed) к счетчикам всех предков задачи (без нее самой)"""
+    if not total and not completed:
+        return
+    db.execute(
+        update(Task).where(Task.id.in_(
+            select(TaskClosure.ancestor_id).where(TaskClosure.descendant_id == task_id, TaskClosure.depth > 0)
+        )).values(
+            descendant_count=Task.descendant_count + total,
+            descendant_completed_count=Task.descendant_completed_count + completed
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def count_into_ancestors(db: Session, node_ids: Union[List[int], Select], column, delta: int = 1) -> None:
+    """
+    Прибавить к счетчику column каждого предка delta за каждую задачу из
+    node_ids (список или подзапрос id), лежащую ниже него. Один UPDATE для
+    произвольного набора задач - например, всех вставленных пакетом
+    """
+    below = select(func.count()).select_from(TaskClosure).where(
+        TaskClosure.ancestor_id == Task.id, TaskClosure.depth > 0, TaskClosure.descendant_id.in_(node_ids)
+    ).scalar_subquery()
+    db.execute(
+        update(Task).where(Task.id.in_(
+            select(TaskClosure.ancestor_id).where(TaskClosure.descendant_id.in_(node_ids), TaskClosure.depth > 0)
+        )).values({column: column + delta * below}).execution_options(synchronize_session=False)
+    )
+
+
+def add_task_node(db: Session, task_id: int, parent_id: Optional[int] = None) -> None:
+    """Добавить новую задачу (лист) в замыкание"""
+    add_task_nodes(db, [(task_id, parent_id)])
+
+
+def add_task_nodes(db: Session, nodes: List[Tuple[int, Optional[int]]]) -> None:
+    """
+    Добавить новые задачи (task_id, parent_id) в замыкание двумя executemany
+    Родители должны уже быть в замыкании
+    """
+    if not nodes:
+        return
+    db.execute(insert(TaskClosure), [
+        {'ancestor_id': task_id, 'descendant_id': task_id, 'depth': 0} for task_id, _ in nodes
+    ])
+    children = [{'node_id': task_id, 'parent_id': parent_id} for task_id, parent_id in nodes if parent_id is not None]
+    if children:
+        db.execute(insert(TaskClosure.__table__).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select(TaskClosure.ancestor_id, bindparam('node_id', type_=Integer), TaskClosure.depth + 1)
+            .where(TaskClosure.descendant_id == bindparam('parent_id', type_=Integer))
+        ), children)
+
+
+def detach_subtree(db: Session, task_id: int) -> None:
+    """Удалить связи поддерева задачи с ее предками (задача становится корнем)"""
+    db.execute(delete(TaskClosure).where(
+        TaskClosure.descendant_id.in_(subtree_ids(task_id)),
+        TaskClosure.ancestor_id.in_(ancestor_ids(task_id)),
+        TaskClosure.ancestor_id != task_id
+    ))
+
+
+def move_task_subtree(db: Session, task_id: int, new_parent_id: Optional[int] = None) -> None:
+    """
+    Перенести поддерево задачи под new_parent_id (None - в корень)
+    Проверку на цикл (is_in_subtree) выполняет вызывающий код
+    """
+    total, completed = subtree_counts(db, task_id)
+    shift_ancestor_counts(db, task_id, -total, -completed)
+    detach_subtree(db, task_id)
+    if new_parent_id is None:
+        return
+    attach_subtree(db, task_id, new_parent_id)
+    shift_ancestor_counts(db, task_id, total, completed)
+
+
+def copy_subtree_paths(db: Session, ranks, base: int) -> None:
+    """
+    Вставить пути копии поддерева: задача с рангом rn из ranks (подзапрос
+    с колонками id, rn) получает в копии id base + rn
+    """
+    ancestor = ranks.alias()
+    descendant = ranks.alias()
+    db.execute(insert(TaskClosure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(base + ancestor.c.rn, base + descendant.c.rn, TaskClosure.depth)
+        .join(ancestor, ancestor.c.id == TaskClosure.ancestor_id)
+        .join(descendant, descendant.c.id == TaskClosure.descendant_id)
+    ))
+
+
+def attach_subtree(db: Session, task_id: int, parent_id: int) -> None:
+    """Связать поддерево корня task_id (без предков) с parent_id и всеми его предками"""
+    above = aliased(TaskClosure)
+    below = aliased(TaskClosure)
+    db.execute(insert(TaskClosure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'],
+        select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+        .select_from(above).join(below, true())
+        .where(above.descendant_id == parent_id, below.ancestor_id == task_id)
+    ))
+
+
+def remove_task_nodes(db: Session, task_ids: List[int]) -> None:
+    """Удалить из замыкания все строки, где задачи task_ids - предок или потомок"""
+    db.execute(delete(TaskClosure).where(
+        or_(TaskClosure.descendant_id.in_(task_ids), TaskClosure.ancestor_id.in_(task_ids))
+    ))
+
+
+def _closure_paths():
+    """Ожидаемые строки замыкания, выведенные из parent_id рекурсивным CTE"""
+    paths = select(
+        Task.id.label('ancestor_id'), Task.id.label('descendant_id'), literal(0).label('depth')
+    ).cte('paths', recursive=True)
+    child = aliased(Task)
+    paths = paths.union_all(
+        select(paths.c.ancestor_id, child.id, paths.c.depth + 1)
+        .where(child.parent_id == paths.c.descendant_id)
+    )
+    return select(paths.c.ancestor_id, paths.c.descendant_id, paths.c.depth)
+
+
+def rebuild_task_closure(db: Session) -> int:
+    """Полностью пересобрать task_closure по parent_id. Возвращает число строк"""
+    db.execute(delete(TaskClosure))
+    db.execute(insert(TaskClosure).from_select(
+        ['ancestor_id', 'descendant_id', 'depth'], _closure_paths()
+    ))
+    db.commit()
+    return db.query(TaskClosure).count()
+
+
+def check_task_closure(db: Session) -> int:
+    """Число строк, которыми task_closure расходится с parent_id (0 - согласовано)"""
+    stored = select(TaskClosure.ancestor_id, TaskClosure.descendant_id, TaskClosure.depth)
+    missing = _closure_paths().except_(stored).subquery()
+    extra = stored.except_(_closure_paths()).subquery()
+    return (
+        db.execute(select(func.count()).select_from(missing)).scalar()
+        + db.execute(select(func.count()).select_from(extra)).scalar()
+    )
+
+
+def _descendant_counts():
+    """Фактические (descendant_count, descendant_completed_count) задачи, коррелированные с tasks"""
+    node = aliased(Task)
+    below = select(func.count()).select_from(TaskClosure).join(node, node.id == TaskClosure.descendant_id).where(
+        TaskClosure.ancestor_id == Task.id, TaskClosure.depth > 0, node.deleted_at == None
+    )
+    return below.scalar_subquery(), below.where(node.is_completed == True).scalar_subquery()
+
+
+def rebuild_descendant_counts(db: Session) -> int:
+    """Пересчитать счетчики прогресса всех задач по task_closure. Возвращает число задач"""
+    total, completed = _descendant_counts()
+    rows = db.execute(
+        update(Task).values(descendant_count=total, descendant_completed_count=completed)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return rows
+
+
+def check_descendant_counts(db: Session) -> List[Tuple[int, int, int, int, int]]:
+    """
+    Неудаленные задачи с неверными счетчиками прогресса:
+    (id, descendant_count, фактический, descendant_completed_count, фактический)
+    """
+    total, completed = _descendant_counts()
+    return [tuple(row) for row in db.execute(
+        select(Task.id, Task.descendant_count, total, Task.descendant_completed_count, completed)
+        .where(Task.deleted_at == None, or_(Task.descendant_count != total, Task.descendant_completed_count != completed))
+        .order_by(Task.id)
+    )]
+
+
+def ensure_task_closure(db: Session) -> bool:
+    """
+    Заполнить task_closure, если она пуста при непустой tasks: create_all на
+    существующей базе (без migrations/004) создает пустую таблицу, и без
+    заполнения деревья и счетчики прогресса неверны. Вместе с замыканием
+    пересчитываются и счетчики. Возвращает True, если заполнение было
+    """
+    if db.query(TaskClosure).first() is not None or db.query(Task.id).first() is None:
+        return False
+    rebuild_task_closure(db)
+    rebuild_descendant_counts(db)
+    return True
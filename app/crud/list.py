@@ -1,7 +1,13 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, update
 from sqlalchemy.orm import Session
 from app.models.list import TaskList as TaskListModel
 from app.schemas.list import TaskListUpdate
 from app.models.task import Task
+from app.crud.pagination import keyset_page
+from app.crud.position import next_positions
+from app.crud.user import bump_collection_version
 
 
 def get_lists(db: Session, user_id: int, skip: int = 0, limit: int = 100):
@@ -17,6 +23,15 @@ def get_lists(db: Session, user_id: int, skip: int = 0, limit: int = 100):
     )
 
 
+def get_lists_page(db: Session, user_id: int, limit: int = 100, cursor: Optional[str] = None):
+    """
+    Retrieve a page of task lists owned by the user in id order, after the cursor.
+    Returns (lists, next_cursor).
+    """
+    query = db.query(TaskListModel).filter(TaskListModel.creator_id == user_id)
+    return keyset_page(query, TaskListModel.id, TaskListModel.id, limit, cursor)
+
+
 def get_list(db: Session, list_id: int, user_id: int):
     """
     Retrieve a task list by its ID only if it belongs to the given user.
@@ -45,6 +60,7 @@ def create_list(db: Session, name: str, creator_id: int):
     """
     db_task_list = TaskListModel(name=name, creator_id=creator_id)
     db.add(db_task_list)
+    bump_collection_version(db, creator_id)
     db.commit()
     db.refresh(db_task_list)
     return db_task_list
@@ -59,6 +75,7 @@ def update_list(db: Session, list_id: int, task_list: TaskListUpdate, user_id: i
         return None
     for key, value in task_list.dict(exclude_unset=True).items():
         setattr(db_task_list, key, value)
+    bump_collection_version(db, user_id)
     db.commit()
     db.refresh(db_task_list)
     return db_task_list
@@ -72,13 +89,15 @@ def delete_list(db: Session, list_id: int, user_id: int):
     if not db_task_list:
         return False
     db.delete(db_task_list)
+    bump_collection_version(db, user_id)
     db.commit()
     return True
 
 
 def get_tasks_in_list(db: Session, list_id: int, user_id: int):
     """
-    Retrieve all root tasks in a specific task list if the list belongs to the user.
+    Retrieve all root tasks in a specific task list if the list belongs to the user,
+    in manual order (position).
     Returns full Task objects (not IDs).
     """
     if get_list(db, list_id, user_id) is None:
@@ -86,37 +105,73 @@ def get_tasks_in_list(db: Session, list_id: int, user_id: int):
     return db.query(Task).filter(
         Task.task_list_id == list_id,
         Task.owner_id == user_id,
-        Task.parent_id == None
-    ).all()
+        Task.parent_id == None,
+        Task.deleted_at == None
+    ).order_by(Task.position, Task.id).all()
 
 
-def add_task_to_list(db: Session, list_id: int, task_id: int, user_id: int):
+def update_list_membership(db: Session, list_id: int, op: str, task_ids: List[int], user_id: int,
+                           target_list_id: Optional[int] = None) -> Optional[List[Dict]]:
     """
-    Add a root task to a task list if the list belongs to the user.
-    Subtasks cannot belong to lists.
+    Change list membership of many root tasks with one ownership-checked UPDATE:
+    add - into the list (from anywhere), remove - out of the list,
+    move - from the list into target_list_id. Tasks entering a list are
+    appended to its end in task_ids order.
+    Returns per-id results (task_id, ok, error) or None if the list is not found;
+    raises ValueError('invalid_list') if target_list_id is not found.
     """
     if get_list(db, list_id, user_id) is None:
-        return False
-    task = db.query(Task).filter(Task.id == task_id, Task.owner_id == user_id).first()
-    if not task or task.parent_id is not None:
-        return False
-    task.task_list_id = list_id
+        return None
+    if op == 'add':
+        target = list_id
+    elif op == 'remove':
+        target = None
+    else:
+        if target_list_id is None or get_list(db, target_list_id, user_id) is None:
+            raise ValueError('invalid_list')
+        target = target_list_id
+
+    ids = list(dict.fromkeys(task_ids))
+    matched = and_(
+        Task.id.in_(ids), Task.owner_id == user_id, Task.parent_id == None, Task.deleted_at == None
+    )
+    if op != 'add':
+        matched = and_(matched, Task.task_list_id == list_id)
+    keys = next_positions(db, (user_id, None, target), len(ids))
+    # Tasks already in the target list keep their place
+    position = case(
+        (Task.task_list_id.is_distinct_from(target), case(dict(zip(ids, keys)), value=Task.id)),
+        else_=Task.position
+    )
+    updated = set(db.execute(
+        update(Task).where(matched).values(task_list_id=target, position=position)
+        .returning(Task.id).execution_options(synchronize_session='fetch')
+    ).scalars())
+    if updated:
+        bump_collection_version(db, user_id)
     db.commit()
-    return True
+    return [
+        {'task_id': task_id, 'ok': task_id in updated, 'error': None if task_id in updated else 'not_found'}
+        for task_id in task_ids
+    ]
+
+
+def add_task_to_list(db: Session, list_id: int, task_id: int, user_id: int) -> Optional[bool]:
+    """
+    Add a root task to a task list if the list belongs to the user.
+    Subtasks cannot belong to lists. None - the list is not found.
+    """
+    results = update_list_membership(db, list_id, 'add', [task_id], user_id)
+    return None if results is None else results[0]['ok']
 
 
-def remove_task_from_list(db: Session, list_id: int, task_id: int, user_id: int):
+def remove_task_from_list(db: Session, list_id: int, task_id: int, user_id: int) -> Optional[bool]:
     """
     Remove a root task from a task list if the list belongs to the user.
+    None - the list is not found.
     """
-    if get_list(db, list_id, user_id) is None:
-        return False
-    task = db.query(Task).filter(Task.id == task_id, Task.owner_id == user_id).first()
-    if not task or task.task_list_id != list_id:
-        return False
-    task.task_list_id = None
-    db.commit()
-    return True
+    results = update_list_membership(db, list_id, 'remove', [task_id], user_id)
+    return None if results is None else results[0]['ok']
 
 
 def get_list_tasks(db: Session, list_id: int, user_id: int):
@@ -127,5 +182,6 @@ def get_list_tasks(db: Session, list_id: int, user_id: int):
     return db.query(Task).filter(
         Task.task_list_id == list_id,
         Task.owner_id == user_id,
-        Task.parent_id == None
-    ).all()
+        Task.parent_id == None,
+        Task.deleted_at == None
+    ).order_by(Task.position, Task.id).all()
@@ -0,0 +1,67 @@
+"""
+Курсорная (keyset) пагинация
+
+Курсор - непрозрачная строка: base64url от JSON [значение ключа сортировки, id]
+последней строки страницы. Следующая страница выбирается условием
+(key, id) > (value, id) по композитному индексу (owner, key, id), поэтому
+глубина страницы не влияет на время запроса, в отличие от OFFSET.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import DateTime, and_, or_, tuple_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(value: Any, row_id: int) -> str:
+    """Упаковать позицию (значение ключа, id) в курсор"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """Распаковать курсор, ValueError('invalid_cursor') при неверном формате"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError('invalid_cursor')
+    if not isinstance(row_id, int):
+        raise ValueError('invalid_cursor')
+    return value, row_id
+
+
+def _after(key, id_column, value, row_id):
+    """Условие "строго после (value, row_id)" в порядке ORDER BY key, id (NULL - первыми)"""
+    if key is id_column:
+        return id_column > row_id
+    if value is None:
+        return or_(key != None, and_(key == None, id_column > row_id))
+    return tuple_(key, id_column) > tuple_(value, row_id)
+
+
+def keyset_page(query: Query, key, id_column, limit: int,
+                cursor: Optional[str] = None) -> Tuple[List, Optional[str]]:
+    """
+    Страница query в порядке (key, id) после позиции cursor
+    Возвращает строки и курсор следующей страницы (None - страница последняя)
+    """
+    if cursor is not None:
+        value, row_id = decode_cursor(cursor)
+        if value is not None and isinstance(key.type, DateTime):
+            try:
+                value = datetime.fromisoformat(value)
+            except (TypeError, ValueError):
+                raise ValueError('invalid_cursor')
+        query = query.filter(_after(key, id_column, value, row_id))
+    order = (id_column,) if key is id_column else (key, id_column)
+    rows = query.order_by(*order).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, key.key), getattr(last, id_column.key))
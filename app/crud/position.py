@@ -0,0 +1,212 @@
+"""
+Ручной порядок задач: дробные лексикографические ключи Task.position
+
+Порядок задается среди "соседей" - задач с одинаковыми (owner_id, parent_id,
+task_list_id): задачи одного списка, задачи вне списков, подзадачи одного
+родителя. Ключ - строка из цифр DIGITS без завершающего '0'; между любыми
+двумя ключами есть третий, поэтому перемещение меняет одну строку.
+При добавлении в начало или конец группы длина ключа растет логарифмически,
+при частых вставках между двумя соседями - линейно; группы с длинными
+ключами (и без ключей - задачи до появления position) перебалансирует
+фоновое обслуживание (app/core/maintenance.py).
+"""
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, bindparam, func, literal_column, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.crud.user import bump_collection_version
+from app.models.task import POSITION_MAX_LENGTH, Task
+
+DIGITS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+# (owner_id, parent_id, task_list_id)
+Group = Tuple[int, Optional[int], Optional[int]]
+
+# Литерал (а не параметр) нужен, чтобы SQLite выбрал частичный индекс ix_tasks_position_rebalance
+NEEDS_REBALANCE = or_(
+    Task.position == None, func.length(Task.position) > literal_column(str(POSITION_MAX_LENGTH))
+)
+
+
+def _increment(low: str) -> str:
+    """
+    Ближайший ключ после low без верхней границы. После k ведущих 'z' стоит
+    (k + 1)-значный счетчик: он увеличивается на единицу, а переполнение
+    добавляет еще одну 'z'. Длина растет как логарифм числа добавлений в конец
+    """
+    leading = len(low) - len(low.lstrip(DIGITS[-1]))
+    width = leading + 1
+    digits = [DIGITS.index(d) for d in low[leading:leading + width].ljust(width, '0')]
+    k = width - 1
+    while digits[k] == len(DIGITS) - 1:
+        digits[k] = 0
+        k -= 1
+    digits[k] += 1
+    return (low[:leading] + ''.join(DIGITS[d] for d in digits)).rstrip('0')
+
+
+def _decrement(high: str) -> str:
+    """Ближайший ключ перед high без нижней границы (зеркально _increment, с ведущими '0')"""
+    leading = len(high) - len(high.lstrip('0'))
+    width = leading + 1
+    digits = [DIGITS.index(d) for d in high[leading:leading + width].ljust(width, '0')]
+    k = width - 1
+    while digits[k] == 0:
+        digits[k] = len(DIGITS) - 1
+        k -= 1
+    digits[k] -= 1
+    # '1' -> пустой ключ: первый ключ следующего разряда
+    return (high[:leading] + ''.join(DIGITS[d] for d in digits)).rstrip('0') or '0' + DIGITS[-1]
+
+
+def _midpoint(low: str, high: Optional[str]) -> str:
+    """Ключ строго между low и high ('' - без нижней границы, None - без верхней)"""
+    if high is None:
+        return _increment(low) if low else DIGITS[len(DIGITS) // 2]
+    if not low:
+        return _decrement(high)
+    n = 0
+    while n < len(high) and (low[n] if n < len(low) else '0') == high[n]:
+        n += 1
+    if n > 0:
+        return high[:n] + _midpoint(low[n:], high[n:])
+    low_digit = DIGITS.index(low[0])
+    high_digit = DIGITS.index(high[0]) if high else len(DIGITS)
+    if high_digit - low_digit > 1:
+        return DIGITS[(low_digit + high_digit + 1) // 2]
+    if len(high) > 1:
+        return high[0]
+    return DIGITS[low_digit] + _midpoint(low[1:], None)
+
+
+def key_between(before: Optional[str], after: Optional[str]) -> str:
+    """
+    Ключ между соседями before и after (None - начало / конец группы)
+    ValueError('invalid_position'), если before >= after
+    """
+    if before is not None and after is not None and before >= after:
+        raise ValueError('invalid_position')
+    return _midpoint(before or '', after)
+
+
+def even_keys(count: int) -> List[str]:
+    """count возрастающих ключей минимальной длины, равномерно распределенных"""
+    length = 1
+    while len(DIGITS) ** length < count + 1:
+        length += 1
+    span = len(DIGITS) ** length
+    keys = []
+    for i in range(count):
+        value = (i + 1) * span // (count + 1)
+        digits = []
+        for _ in range(length):
+            value, digit = divmod(value, len(DIGITS))
+            digits.append(DIGITS[digit])
+        keys.append(''.join(reversed(digits)).rstrip('0'))
+    return keys
+
+
+def group_of(task: Task) -> Group:
+    """Группа соседей задачи"""
+    return task.owner_id, task.parent_id, task.task_list_id
+
+
+def in_group(group: Group):
+    """Условие "задача из группы group" """
+    owner_id, parent_id, task_list_id = group
+    return and_(Task.owner_id == owner_id, Task.parent_id == parent_id, Task.task_list_id == task_list_id)
+
+
+def next_position(db: Session, group: Group, exclude_id: Optional[int] = None) -> str:
+    """Ключ для задачи, добавляемой в конец группы"""
+    query = select(func.max(Task.position)).where(in_group(group))
+    if exclude_id is not None:
+        query = query.where(Task.id != exclude_id)
+    return key_between(db.execute(query).scalar(), None)
+
+
+def next_positions(db: Session, group: Group, count: int) -> List[str]:
+    """
+    count возрастающих ключей для пачки задач, добавляемых в конец группы:
+    общий префикс после последнего ключа плюс равномерные ключи even_keys,
+    чтобы длина не росла с размером пачки
+    """
+    prefix = next_position(db, group)
+    return [prefix + key for key in even_keys(count)]
+
+
+def _neighbour_key(db: Session, group: Group, task_id: int, neighbour_id: int) -> str:
+    """Ключ соседа neighbour_id; ValueError('invalid_position') - сосед не из группы задачи"""
+    position = db.execute(
+        select(Task.position).where(in_group(group), Task.id == neighbour_id, Task.id != task_id, Task.deleted_at == None)
+    ).scalar()
+    if position is None:
+        raise ValueError('invalid_position')
+    return position
+
+
+def position_between(db: Session, task: Task, after_id: Optional[int] = None,
+                     before_id: Optional[int] = None) -> str:
+    """
+    Ключ для перемещения задачи сразу после after_id и / или перед before_id
+    (соседи - из той же группы). Без соседей - в начало группы.
+    Группа с задачами без ключа или с совпадающими ключами соседей сначала
+    перебалансируется
+    """
+    group = group_of(task)
+    others = and_(in_group(group), Task.id != task.id, Task.deleted_at == None)
+    unkeyed = db.execute(select(Task.id).where(others, Task.position == None).limit(1)).first()
+    if unkeyed is not None:
+        rebalance_group(db, group)
+    for attempt in range(2):
+        before = _neighbour_key(db, group, task.id, after_id) if after_id is not None else None
+        after = _neighbour_key(db, group, task.id, before_id) if before_id is not None else None
+        if before_id is None:
+            query = select(func.min(Task.position)).where(others)
+            after = db.execute(query.where(Task.position > before) if before is not None else query).scalar()
+        elif after_id is None:
+            before = db.execute(select(func.max(Task.position)).where(others, Task.position < after)).scalar()
+        if before is None or after is None or before < after:
+            return key_between(before, after)
+        if attempt:
+            raise ValueError('invalid_position')
+        rebalance_group(db, group)
+
+
+def rebalance_group(db: Session, group: Group) -> int:
+    """
+    Переписать ключи группы равномерными ключами минимальной длины,
+    сохранив порядок (задачи без ключа - первыми). Без commit.
+    Возвращает число задач группы
+    """
+    ids = db.execute(
+        select(Task.id).where(in_group(group), Task.deleted_at == None)
+        .order_by(Task.position, Task.id)
+    ).scalars().all()
+    if ids:
+        db.execute(
+            update(Task.__table__).where(Task.__table__.c.id == bindparam('task_id')),
+            [{'task_id': task_id, 'position': key} for task_id, key in zip(ids, even_keys(len(ids)))]
+        )
+    return len(ids)
+
+
+def rebalance_positions(db: Session, max_groups: Optional[int] = None) -> int:
+    """
+    Перебалансировать группы, где есть задачи без ключа или с ключом длиннее
+    POSITION_MAX_LENGTH (по ix_tasks_position_rebalance). Ключи видны в ответах,
+    поэтому растет collection_version владельца. Commit после каждой группы.
+    Возвращает число перебалансированных групп
+    """
+    query = select(Task.owner_id, Task.parent_id, Task.task_list_id).where(
+        NEEDS_REBALANCE, Task.deleted_at == None
+    ).distinct()
+    if max_groups is not None:
+        query = query.limit(max_groups)
+    groups: List[Group] = [tuple(row) for row in db.execute(query)]
+    for group in groups:
+        rebalance_group(db, group)
+        bump_collection_version(db, group[0])
+        db.commit()
+    return len(groups)
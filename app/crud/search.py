@@ -0,0 +1,78 @@
+"""
+Полнотекстовый поиск по задачам (SQLite FTS5, таблица tasks_fts)
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models.task import Task, TASKS_FTS_DDL
+
+tasks_fts = table('tasks_fts', column('rowid'), column('title'), column('description'))
+
+# Вес совпадения в названии относительно описания (bm25)
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """
+    Запрос пользователя -> выражение MATCH
+    Каждое слово берется в кавычки (синтаксис FTS5 пользователю недоступен)
+    и ищется по префиксу; слова объединяются через AND
+    """
+    terms = ['"' + word.replace('"', '""') + '"*' for word in q.split()]
+    return ' '.join(terms) if terms else None
+
+
+def search_tasks(db: Session, user_id: int, q: str, limit: int = 50,
+                 is_completed: Optional[bool] = None) -> List[Dict]:
+    """
+    Задачи пользователя, подходящие под запрос, от более релевантных к менее
+    Кроме полей задачи возвращает rank, title_highlight и snippet
+    """
+    match = build_match_query(q)
+    if match is None:
+        return []
+    rank = func.bm25(literal_column('tasks_fts'), TITLE_WEIGHT, DESCRIPTION_WEIGHT)
+    query = select(
+        *Task.__table__.columns,
+        rank.label('rank'),
+        func.highlight(literal_column('tasks_fts'), 0, HIGHLIGHT_START, HIGHLIGHT_END).label('title_highlight'),
+        func.snippet(literal_column('tasks_fts'), 1, HIGHLIGHT_START, HIGHLIGHT_END, '…', 12).label('snippet')
+    ).select_from(tasks_fts).join(
+        Task, Task.id == tasks_fts.c.rowid
+    ).where(
+        literal_column('tasks_fts').op('MATCH')(match),
+        Task.owner_id == user_id,
+        Task.deleted_at == None
+    )
+    if is_completed is not None:
+        query = query.where(Task.is_completed == is_completed)
+    rows = db.execute(query.order_by(rank).limit(limit)).mappings()
+    return [dict(row) for row in rows]
+
+
+def rebuild_search_index(db: Session) -> int:
+    """Создать tasks_fts и триггеры, если их нет, и переиндексировать tasks"""
+    for statement in TASKS_FTS_DDL:
+        db.execute(text(statement))
+    db.execute(text("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')"))
+    db.commit()
+    return db.query(Task).count()
+
+
+def ensure_search_index(db: Session) -> bool:
+    """
+    Переиндексировать tasks, если tasks_fts пуста при непустой tasks (таблицу
+    только что создал create_all на существующей базе). Возвращает True,
+    если переиндексация была
+    """
+    indexed = db.execute(text("SELECT 1 FROM tasks_fts_docsize LIMIT 1")).first()
+    if indexed is not None or db.query(Task.id).first() is None:
+        return False
+    rebuild_search_index(db)
+    return True
@@ -0,0 +1,237 @@
+"""
+CRUD операции для статистики выполненных задач
+
+Пирамида rollup-таблиц: user_daily_stats (дни) и user_period_stats
+(недели и месяцы), обновляемые одними и теми же изменениями.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, literal, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.stats import UserDailyStats, UserPeriodStats
+from app.models.task import Task
+from app.models.user import User
+
+
+# Уровни пирамиды над дневной статистикой
+PERIOD_GRANULARITIES = ("week", "month")
+
+
+def period_start(day: date, granularity: str) -> date:
+    """Начало периода (день, неделя с понедельника, месяц, квартал, год), содержащего день"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    if granularity == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if granularity == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def next_period_start(start: date, granularity: str) -> date:
+    """Начало следующего периода"""
+    if granularity == "day":
+        return start + timedelta(days=1)
+    if granularity == "week":
+        return start + timedelta(days=7)
+    months = {"month": 1, "quarter": 3, "year": 12}[granularity]
+    month_index = start.year * 12 + start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def _period_start_sql(day_column, granularity: str):
+    """SQL-выражение начала периода для колонки с датой"""
+    if granularity == "week":
+        return func.date(day_column, "weekday 0", "-6 days")
+    return func.date(day_column, "start of month")
+
+
+def apply_daily_deltas(db: Session, user_id: int, deltas: Dict[date, int]) -> None:
+    """
+    Прибавить изменения к счетчикам по дням, неделям и месяцам
+    (по одному upsert-запросу на уровень пирамиды)
+    """
+    if not deltas:
+        return
+    stmt = insert(UserDailyStats).values([
+        {'user_id': user_id, 'day': day, 'tasks_done': delta}
+        for day, delta in deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserDailyStats.user_id, UserDailyStats.day],
+        set_={'tasks_done': UserDailyStats.tasks_done + stmt.excluded.tasks_done}
+    )
+    db.execute(stmt)
+
+    period_deltas: Dict[Tuple[str, date], int] = defaultdict(int)
+    for day, delta in deltas.items():
+        for granularity in PERIOD_GRANULARITIES:
+            period_deltas[(granularity, period_start(day, granularity))] += delta
+    stmt = insert(UserPeriodStats).values([
+        {'user_id': user_id, 'granularity': granularity, 'period_start': start, 'tasks_done': delta}
+        for (granularity, start), delta in period_deltas.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserPeriodStats.user_id, UserPeriodStats.granularity, UserPeriodStats.period_start],
+        set_={'tasks_done': UserPeriodStats.tasks_done + stmt.excluded.tasks_done}
+    )
+    db.execute(stmt)
+
+
+def get_daily_counts(db: Session, user_id: int, start_date: date, end_date: date) -> Dict[date, int]:
+    """Количество выполненных задач по дням за период (из rollup)"""
+    rows = db.query(UserDailyStats.day, UserDailyStats.tasks_done).filter(
+        UserDailyStats.user_id == user_id,
+        UserDailyStats.day >= start_date,
+        UserDailyStats.day <= end_date,
+        UserDailyStats.tasks_done > 0
+    ).all()
+    return {day: tasks_done for day, tasks_done in rows}
+
+
+def get_period_counts(
+    db: Session,
+    user_id: int,
+    granularity: str,
+    start_date: date,
+    end_date: date
+) -> Dict[date, int]:
+    """Количество выполненных задач по неделям или месяцам за период (по началу периода)"""
+    rows = db.query(UserPeriodStats.period_start, UserPeriodStats.tasks_done).filter(
+        UserPeriodStats.user_id == user_id,
+        UserPeriodStats.granularity == granularity,
+        UserPeriodStats.period_start >= start_date,
+        UserPeriodStats.period_start <= end_date,
+        UserPeriodStats.tasks_done > 0
+    ).all()
+    return {start: tasks_done for start, tasks_done in rows}
+
+
+def _raw_daily_counts_query():
+    """Агрегация выполненных задач по (owner_id, day) напрямую из tasks"""
+    task_day = func.date(func.coalesce(Task.completed_at, Task.created_at))
+    return select(
+        Task.owner_id,
+        task_day,
+        func.count(Task.id)
+    ).where(
+        Task.is_completed == True,
+        Task.owner_id != None,
+        Task.deleted_at == None
+    ).group_by(Task.owner_id, task_day)
+
+
+def rebuild_daily_stats(db: Session) -> int:
+    """
+    Полностью пересобрать user_daily_stats (и уровни пирамиды) по таблице tasks
+    Возвращает количество записанных дневных строк
+    """
+    db.execute(delete(UserDailyStats))
+    result = db.execute(
+        insert(UserDailyStats).from_select(
+            ['user_id', 'day', 'tasks_done'],
+            _raw_daily_counts_query()
+        )
+    )
+    rebuild_period_stats(db)
+    # Данные аналитики изменились у всех пользователей - сбрасываем кэш метрик
+    db.execute(update(User).values(data_version=User.data_version + 1))
+    db.commit()
+    return result.rowcount
+
+
+def ensure_daily_stats(db: Session) -> bool:
+    """
+    Заполнить rollup, если он пуст при наличии выполненных задач: create_all
+    на существующей базе создает user_daily_stats и user_period_stats пустыми,
+    и без заполнения аналитика возвращает нули, а снятие отметки со старых
+    задач уводит счетчики в минус. Возвращает True, если заполнение было
+    """
+    if db.query(UserDailyStats.user_id).first() is None:
+        if db.execute(select(_raw_daily_counts_query().limit(1).subquery())).first() is None:
+            return False
+        rebuild_daily_stats(db)
+        return True
+    if db.query(UserPeriodStats.user_id).first() is None:
+        rebuild_period_stats(db)
+        db.commit()
+        return True
+    return False
+
+
+def _period_counts_query(granularity: str):
+    """Агрегация user_daily_stats по (user_id, начало периода)"""
+    start = _period_start_sql(UserDailyStats.day, granularity)
+    return select(
+        UserDailyStats.user_id,
+        start,
+        func.sum(UserDailyStats.tasks_done)
+    ).group_by(UserDailyStats.user_id, start)
+
+
+def rebuild_period_stats(db: Session) -> None:
+    """Пересобрать недельный и месячный уровни из user_daily_stats (без commit)"""
+    db.execute(delete(UserPeriodStats))
+    for granularity in PERIOD_GRANULARITIES:
+        # Та же агрегация, что и при сверке (check_period_stats)
+        user_id, start, tasks_done = _period_counts_query(granularity).subquery().c
+        query = select(user_id, literal(granularity), start, tasks_done)
+        db.execute(
+            insert(UserPeriodStats).from_select(
+                ['user_id', 'granularity', 'period_start', 'tasks_done'],
+                query
+            )
+        )
+
+
+def check_daily_stats(db: Session, user_id: Optional[int] = None) -> List[Tuple[int, date, int, int]]:
+    """
+    Сравнить rollup с сырыми данными tasks
+    Возвращает список расхождений (user_id, day, rollup_value, actual_value)
+    """
+    raw_query = _raw_daily_counts_query()
+    stats_query = db.query(UserDailyStats).filter(UserDailyStats.tasks_done != 0)
+    if user_id is not None:
+        raw_query = raw_query.where(Task.owner_id == user_id)
+        stats_query = stats_query.filter(UserDailyStats.user_id == user_id)
+
+    actual = {(owner_id, date.fromisoformat(day)): count for owner_id, day, count in db.execute(raw_query)}
+    rollup = {(row.user_id, row.day): row.tasks_done for row in stats_query}
+
+    mismatches = []
+    for key in sorted(actual.keys() | rollup.keys()):
+        expected = actual.get(key, 0)
+        stored = rollup.get(key, 0)
+        if expected != stored:
+            mismatches.append((key[0], key[1], stored, expected))
+    return mismatches
+
+
+def check_period_stats(db: Session, user_id: Optional[int] = None) -> List[Tuple[int, str, date, int, int]]:
+    """
+    Сравнить недельный и месячный уровни с user_daily_stats
+    Возвращает список расхождений (user_id, granularity, period_start, stored, expected)
+    """
+    mismatches = []
+    for granularity in PERIOD_GRANULARITIES:
+        raw_query = _period_counts_query(granularity)
+        stats_query = db.query(UserPeriodStats).filter(
+            UserPeriodStats.granularity == granularity,
+            UserPeriodStats.tasks_done != 0
+        )
+        if user_id is not None:
+            raw_query = raw_query.where(UserDailyStats.user_id == user_id)
+            stats_query = stats_query.filter(UserPeriodStats.user_id == user_id)
+
+        actual = {(uid, date.fromisoformat(start)): count for uid, start, count in db.execute(raw_query) if count}
+        stored = {(row.user_id, row.period_start): row.tasks_done for row in stats_query}
+        for key in sorted(actual.keys() | stored.keys()):
+            if actual.get(key, 0) != stored.get(key, 0):
+                mismatches.append((key[0], granularity, key[1], stored.get(key, 0), actual.get(key, 0)))
+    return mismatches
@@ -0,0 +1,94 @@
+"""
+Дельта-синхронизация задач и списков по журналу change_log
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models.list import TaskList
+from app.models.sync import ChangeLog, SyncWatermark
+from app.models.task import Task
+
+
+class SyncCursorExpired(Exception):
+    """Курсор старше сжатой части журнала - нужна полная синхронизация"""
+
+
+def _current_seq(db: Session, user_id: int) -> int:
+    """Последний seq журнала пользователя"""
+    return db.execute(
+        select(func.coalesce(func.max(ChangeLog.seq), 0)).where(ChangeLog.user_id == user_id)
+    ).scalar()
+
+
+def get_changes(db: Session, user_id: int, since: int = 0, limit: int = 1000) -> Dict:
+    """
+    Изменения задач и списков пользователя после курсора since
+    since = 0 - полный снимок. Иначе читается до limit записей журнала;
+    сущность, измененная несколько раз, возвращается один раз в текущем
+    состоянии, а отсутствующая в таблице или помеченная удаленной - как удаленная.
+    Возвращает cursor, has_more, tasks, lists, deleted_tasks, deleted_lists
+    """
+    if since <= 0:
+        cursor = _current_seq(db, user_id)
+        return {
+            'cursor': cursor,
+            'has_more': False,
+            'tasks': db.query(Task).filter(Task.owner_id == user_id, Task.deleted_at == None).all(),
+            'lists': db.query(TaskList).filter(TaskList.creator_id == user_id).all(),
+            'deleted_tasks': [],
+            'deleted_lists': []
+        }
+
+    purged = db.execute(
+        select(SyncWatermark.purged_seq).where(SyncWatermark.user_id == user_id)
+    ).scalar()
+    if purged is not None and since < purged:
+        raise SyncCursorExpired()
+
+    entries = db.execute(
+        select(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id)
+        .where(ChangeLog.user_id == user_id, ChangeLog.seq > since)
+        .order_by(ChangeLog.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    cursor = entries[-1].seq if entries else since
+
+    task_ids = {e.entity_id for e in entries if e.entity == 'task'}
+    list_ids = {e.entity_id for e in entries if e.entity == 'list'}
+    tasks = db.query(Task).filter(
+        Task.id.in_(task_ids), Task.owner_id == user_id, Task.deleted_at == None
+    ).all() if task_ids else []
+    lists = db.query(TaskList).filter(TaskList.id.in_(list_ids), TaskList.creator_id == user_id).all() if list_ids else []
+    return {
+        'cursor': cursor,
+        'has_more': has_more,
+        'tasks': tasks,
+        'lists': lists,
+        'deleted_tasks': sorted(task_ids - {t.id for t in tasks}),
+        'deleted_lists': sorted(list_ids - {l.id for l in lists})
+    }
+
+
+def compact_change_log(db: Session, retention_days: int, now: Optional[datetime] = None) -> int:
+    """
+    Удалить записи журнала старше retention_days, запомнив для каждого
+    пользователя границу удаленного (sync_watermark). Возвращает число удаленных записей
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    expired = ChangeLog.changed_at < cutoff
+    purged = select(ChangeLog.user_id, func.max(ChangeLog.seq)).where(expired).group_by(ChangeLog.user_id)
+    stmt = insert(SyncWatermark).from_select(['user_id', 'purged_seq'], purged)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[SyncWatermark.user_id],
+        set_={'purged_seq': func.max(SyncWatermark.purged_seq, stmt.excluded.purged_seq)}
+    )
+    db.execute(stmt)
+    deleted = db.execute(delete(ChangeLog).where(expired)).rowcount
+    db.commit()
+    return deleted
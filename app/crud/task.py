@@ -1,35 +1,228 @@
 """
 CRUD операции для задач
 """
+import heapq
+from collections import defaultdict
+from datetime import date, datetime
+from itertools import islice
+from sqlalchemy import and_, case, delete, false, func, insert, literal, not_, null, or_, select, update
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
-from app.models.task import Task
+from app.models.task import Task, TaskClosure
 from app.schemas.task import TaskCreate, TaskUpdate
+from app.crud.stats import apply_daily_deltas
+from app.crud import closure
+from app.crud.position import group_of, next_position, position_between
+from app.crud.pagination import keyset_page
+from app.crud.user import bump_data_version
+
+
+# Задача не помечена удаленной; входит в условие каждой выборки задач
+LIVE_TASK = Task.deleted_at == None
 
 
 def get_task(db: Session, task_id: int, user_id: int) -> Optional[Task]:
     """Получить задачу по ID"""
-    return db.query(Task).filter(Task.id == task_id, Task.owner_id == user_id).first()
+    return db.query(Task).filter(Task.id == task_id, Task.owner_id == user_id, LIVE_TASK).first()
 
 
 def get_tasks(db: Session, user_id: int, skip: int = 0, limit: int = 100, 
-              is_completed: Optional[bool] = None) -> List[Task]:
-    """Получить список задач пользователя"""
-    query = db.query(Task).filter(Task.owner_id == user_id)
+              is_completed: Optional[bool] = None, roots_only: bool = False) -> List[Task]:
+    """Получить список задач пользователя (roots_only - только задачи верхнего уровня)"""
+    query = db.query(Task).filter(Task.owner_id == user_id, LIVE_TASK)
     
+    if roots_only:
+        query = query.filter(Task.parent_id == None)
     if is_completed is not None:
         query = query.filter(Task.is_completed == is_completed)
     
     return query.offset(skip).limit(limit).all()
 
 
+TASK_ORDER_KEYS = {'created_at': Task.created_at, 'due_date': Task.due_date}
+
+
+def get_tasks_page(db: Session, user_id: int, limit: int = 100, cursor: Optional[str] = None,
+                   order_by: str = 'created_at', is_completed: Optional[bool] = None,
+                   roots_only: bool = False) -> Tuple[List[Task], Optional[str]]:
+    """
+    Страница задач пользователя в порядке (order_by, id) после курсора
+    Возвращает задачи и курсор следующей страницы
+    """
+    query = db.query(Task).filter(Task.owner_id == user_id, LIVE_TASK)
+    if roots_only:
+        query = query.filter(Task.parent_id == None)
+    if is_completed is not None:
+        query = query.filter(Task.is_completed == is_completed)
+    return keyset_page(query, TASK_ORDER_KEYS[order_by], Task.id, limit, cursor)
+
+
+# Открытые задачи; литерал (а не параметр) нужен, чтобы SQLite выбрал
+# частичные индексы ix_tasks_open_* (WHERE is_completed = 0 AND deleted_at IS NULL)
+OPEN_TASK = and_(Task.is_completed == false(), LIVE_TASK)
+
+# Вес близости срока в срочности: задача низкого приоритета со сроком сегодня
+# сравнима с задачей высокого приоритета без срока
+URGENCY_DUE_WEIGHT = 2.0
+
+
+def get_agenda(db: Session, user_id: int, start: datetime, end: datetime,
+               limit: int = 200) -> List[Task]:
+    """
+    Открытые задачи пользователя, запланированные или со сроком в [start, end)
+    Порядок - по дате попадания в окно (запланированная важнее срока), затем по id
+    Две выборки в порядке частичных индексов ix_tasks_open_scheduled и
+    ix_tasks_open_due (без сортировки в SQLite), каждая не больше limit
+    строк, сливаются в Python
+    """
+    scheduled_in = and_(Task.scheduled_date >= start, Task.scheduled_date < end)
+    due_in = and_(Task.due_date >= start, Task.due_date < end)
+    base = db.query(Task).filter(Task.owner_id == user_id, OPEN_TASK)
+    scheduled = base.filter(scheduled_in).order_by(Task.scheduled_date, Task.id).limit(limit).all()
+    due = (
+        base.filter(due_in, or_(Task.scheduled_date == None, not_(scheduled_in)))
+        .order_by(Task.due_date, Task.id).limit(limit).all()
+    )
+    merged = heapq.merge(
+        ((t.scheduled_date, t.id, t) for t in scheduled),
+        ((t.due_date, t.id, t) for t in due)
+    )
+    return [t for _, _, t in islice(merged, limit)]
+
+
+def urgency(task: Task, now: datetime) -> float:
+    """Срочность: приоритет плюс близость срока (1 - срок наступил, 0 - срока нет)"""
+    pressure = 0.0
+    if task.due_date is not None:
+        days_left = max((task.due_date - now).total_seconds() / 86400, 0.0)
+        pressure = 1 / (1 + days_left)
+    return (task.priority or 0) + URGENCY_DUE_WEIGHT * pressure
+
+
+def get_urgent_tasks(db: Session, user_id: int, limit: int = 20, now: Optional[datetime] = None,
+                     start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Task]:
+    """
+    Top-K открытых задач по срочности (start / end - только задачи,
+    запланированные или со сроком в окне [start, end), как в get_agenda)
+    При равном приоритете срочность убывает с ростом due_date, поэтому top-K
+    содержится в первых K задачах каждого приоритета по ix_tasks_open_priority_due
+    (задачи без срока - после задач со сроком). Читается не больше K строк
+    на приоритет (в окне - на каждую из выборок), затем кандидаты сливаются по срочности
+    """
+    now = now or datetime.utcnow()
+    base = db.query(Task).filter(Task.owner_id == user_id, OPEN_TASK)
+    priorities = [p for (p,) in db.query(Task.priority).filter(Task.owner_id == user_id, OPEN_TASK).distinct()]
+    if start is not None and end is not None:
+        scheduled_in = and_(Task.scheduled_date >= start, Task.scheduled_date < end)
+        due_in = and_(Task.due_date >= start, Task.due_date < end)
+    candidates: List[Task] = []
+    for priority in priorities:
+        same = base.filter(Task.priority == priority)
+        if start is None or end is None:
+            dated = same.filter(Task.due_date != None).order_by(Task.due_date, Task.id).limit(limit).all()
+            undated = same.filter(Task.due_date == None)
+        else:
+            # Срок в окне - диапазон по ix_tasks_open_priority_due; запланированные
+            # в окне со сроком вне его - по ix_tasks_open_scheduled
+            dated = heapq.nsmallest(limit, (
+                same.filter(due_in).order_by(Task.due_date, Task.id).limit(limit).all()
+                + same.filter(scheduled_in, Task.due_date != None, not_(due_in))
+                .order_by(Task.due_date, Task.id).limit(limit).all()
+            ), key=lambda t: (t.due_date, t.id))
+            undated = same.filter(scheduled_in, Task.due_date == None)
+        candidates.extend(dated)
+        if len(dated) < limit:
+            candidates.extend(undated.order_by(Task.id).limit(limit - len(dated)).all())
+    candidates.sort(key=lambda t: (-urgency(t, now), t.due_date or datetime.max, t.id))
+    return candidates[:limit]
+
+
+def get_task_summary(db: Session, user_id: int, now: Optional[datetime] = None) -> Dict:
+    """
+    Счетчики задач пользователя: всего, открытых, просроченных, выполненных
+    сегодня (UTC) - в целом, по приоритетам и по спискам
+    Один агрегирующий запрос по (task_list_id, priority), читает только
+    покрывающий индекс ix_tasks_owner_summary; свертка групп - в Python
+    """
+    now = now or datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    is_open = Task.is_completed == false()
+    rows = db.execute(
+        select(
+            Task.task_list_id,
+            Task.priority,
+            func.count(),
+            func.count().filter(is_open),
+            func.count().filter(and_(is_open, Task.due_date < now)),
+            func.count().filter(and_(Task.is_completed == True, Task.completed_at >= today))
+        ).where(Task.owner_id == user_id, LIVE_TASK).group_by(Task.task_list_id, Task.priority)
+    ).all()
+
+    def counts():
+        return {'total': 0, 'open': 0, 'overdue': 0, 'completed_today': 0}
+
+    summary = counts()
+    by_priority: Dict[Optional[int], Dict] = defaultdict(counts)
+    by_list: Dict[Optional[int], Dict] = defaultdict(counts)
+    for task_list_id, priority, total, open_, overdue, completed_today in rows:
+        for group in (summary, by_priority[priority], by_list[task_list_id]):
+            group['total'] += total
+            group['open'] += open_
+            group['overdue'] += overdue
+            group['completed_today'] += completed_today
+    summary['by_priority'] = [
+        {'priority': key, **value} for key, value in sorted(by_priority.items(), key=lambda i: (i[0] is None, i[0]))
+    ]
+    summary['by_list'] = [
+        {'task_list_id': key, **value} for key, value in sorted(by_list.items(), key=lambda i: (i[0] is not None, i[0]))
+    ]
+    return summary
+
+
+def get_task_forest(db: Session, root_ids: List[int], user_id: int,
+                    max_depth: Optional[int] = None) -> List[Dict]:
+    """
+    Загрузить поддеревья задач root_ids одним запросом к task_closure
+    Возвращает список корней (в порядке root_ids) в виде словарей с вложенным
+    списком subtasks (в порядке position). max_depth ограничивает глубину (0 - только сами корни)
+    """
+    if not root_ids:
+        return []
+    query = select(*Task.__table__.columns).join(
+        TaskClosure, TaskClosure.descendant_id == Task.id
+    ).where(
+        TaskClosure.ancestor_id.in_(root_ids), Task.owner_id == user_id, LIVE_TASK
+    ).order_by(Task.position, Task.id)
+    if max_depth is not None:
+        query = query.where(TaskClosure.depth <= max_depth)
+    rows = db.execute(query).mappings()
+
+    # Сборка за O(n): сначала все узлы, затем привязка к родителям
+    nodes = {}
+    for row in rows:
+        nodes[row['id']] = dict(row, subtasks=[])
+    roots = set(root_ids)
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        if parent is not None and node['id'] not in roots:
+            parent['subtasks'].append(node)
+    return [nodes[task_id] for task_id in root_ids if task_id in nodes]
+
+
+def get_task_tree(db: Session, task_id: int, user_id: int,
+                  max_depth: Optional[int] = None) -> Optional[Dict]:
+    """Задача со всеми подзадачами (None - задача не найдена)"""
+    forest = get_task_forest(db, [task_id], user_id, max_depth)
+    return forest[0] if forest else None
+
+
 def create_task(db: Session, task: TaskCreate, user_id: int) -> Task:
     """Создать новую задачу"""
     # If parent_id provided, ensure the parent exists and belongs to the same user
     parent_id = getattr(task, 'parent_id', None)
     if parent_id is not None:
-        parent = db.query(Task).filter(Task.id == parent_id, Task.owner_id == user_id).first()
+        parent = get_task(db, parent_id, user_id)
         if parent is None:
             raise ValueError('invalid_parent')
         # Subtasks cannot have a TaskList
@@ -54,7 +247,12 @@ def create_task(db: Session, task: TaskCreate, user_id: int) -> Task:
             parent_id=None,
             task_list_id=getattr(task, 'task_list_id', None)
         )
+    db_task.position = next_position(db, group_of(db_task))
     db.add(db_task)
+    db.flush()
+    closure.add_task_node(db, db_task.id, db_task.parent_id)
+    closure.shift_ancestor_counts(db, db_task.id, 1, 0)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_task)
     return db_task
@@ -62,11 +260,19 @@ def create_task(db: Session, task: TaskCreate, user_id: int) -> Task:
 
 def update_task(db: Session, task_id: int, task: TaskUpdate, user_id: int) -> Optional[Task]:
     """Обновить задачу"""
-    from datetime import datetime
     db_task = get_task(db, task_id, user_id)
     if not db_task:
         return None
-    update_data = task.dict(exclude_unset=True)
+    apply_task_update(db, db_task, task.model_dump(exclude_unset=True), user_id)
+    bump_data_version(db, user_id)
+    db.commit()
+    db.refresh(db_task)
+    return db_task
+
+
+def apply_task_update(db: Session, db_task: Task, update_data: Dict, user_id: int) -> None:
+    """Проверить и применить изменения задачи (без bump_data_version и commit)"""
+    task_id = db_task.id
 
     # Validate parent_id changes and enforce list rules for subtasks
     if 'parent_id' in update_data:
@@ -75,8 +281,11 @@ def update_task(db: Session, task_id: int, task: TaskUpdate, user_id: int) -> Op
             raise ValueError('invalid_parent')
         if new_parent_id is not None:
             # Becoming/remaining a subtask
-            parent = db.query(Task).filter(Task.id == new_parent_id, Task.owner_id == user_id).first()
-            if parent is None:
+            parent = db.get(Task, new_parent_id)
+            if parent is None or parent.owner_id != user_id or parent.deleted_at is not None:
+                raise ValueError('invalid_parent')
+            # The new parent must not lie inside the task's own subtree
+            if closure.is_in_subtree(db, task_id, new_parent_id):
                 raise ValueError('invalid_parent')
             # Subtasks cannot have a TaskList
             update_data['task_list_id'] = None
@@ -88,59 +297,211 @@ def update_task(db: Session, task_id: int, task: TaskUpdate, user_id: int) -> Op
         if db_task.parent_id is not None and 'task_list_id' in update_data:
             raise ValueError('invalid_list_for_subtask')
 
-    # Helpers for recursive cascade
-    def mark_completed_recursively(t: Task):
-        t.is_completed = True
-        if not t.completed_at:
-            t.completed_at = datetime.utcnow()
-        for st in t.subtasks:
-            mark_completed_recursively(st)
-
-    def mark_uncompleted_recursively(t: Task):
-        t.is_completed = False
-        t.completed_at = None
-        for st in t.subtasks:
-            mark_uncompleted_recursively(st)
-
-    # Cascade completion to all subtasks recursively
-    if update_data.get('is_completed') is True and not db_task.completed_at:
-        update_data['completed_at'] = datetime.utcnow()
-        mark_completed_recursively(db_task)
-    elif update_data.get('is_completed') is False:
-        update_data['completed_at'] = None
-        mark_uncompleted_recursively(db_task)
+    if 'parent_id' in update_data and update_data['parent_id'] != db_task.parent_id:
+        closure.move_task_subtree(db, task_id, update_data['parent_id'])
+
+    # Completion cascades to the whole subtree in SQL, not via the ORM
+    is_completed = update_data.pop('is_completed', None)
+    if is_completed is not None:
+        set_subtree_completed(db, task_id, user_id, is_completed)
 
+    group = group_of(db_task)
     for key, value in update_data.items():
         setattr(db_task, key, value)
+    # В новой группе (другой родитель или список) задача встает в конец
+    if group_of(db_task) != group:
+        db_task.position = next_position(db, group_of(db_task), exclude_id=task_id)
+
+
+def move_task(db: Session, task_id: int, user_id: int, after_id: Optional[int] = None,
+              before_id: Optional[int] = None) -> Optional[Task]:
+    """
+    Переставить задачу среди соседей: сразу после after_id и / или перед
+    before_id (без соседей - в начало). Меняется только position задачи.
+    ValueError('invalid_position') - сосед не найден или из другой группы
+    """
+    db_task = get_task(db, task_id, user_id)
+    if not db_task:
+        return None
+    db_task.position = position_between(db, db_task, after_id, before_id)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_task)
     return db_task
 
 
 def delete_task(db: Session, task_id: int, user_id: int) -> bool:
-    """Удалить задачу"""
+    """Удалить задачу вместе с подзадачами (пометкой deleted_at)"""
     db_task = get_task(db, task_id, user_id)
     if not db_task:
         return False
-    
-    db.delete(db_task)
+
+    remove_task(db, db_task, user_id)
+    bump_data_version(db, user_id)
     db.commit()
     return True
 
 
+def remove_task(db: Session, db_task: Task, user_id: int) -> int:
+    """
+    Пометить задачу и все ее подзадачи удаленными одним UPDATE по поддереву
+    из task_closure. Выполненные задачи поддерева вычитаются из статистики
+    по дням и из счетчиков прогресса предков; строки и замыкание позже
+    удаляет purge_deleted_tasks. Без commit.
+    Возвращает число помеченных задач
+    """
+    total, completed = closure.subtree_counts(db, db_task.id)
+    closure.shift_ancestor_counts(db, db_task.id, -total, -completed)
+
+    in_subtree = and_(Task.id.in_(closure.subtree_ids(db_task.id)), Task.owner_id == user_id, LIVE_TASK)
+    day = func.date(func.coalesce(Task.completed_at, Task.created_at))
+    rows = db.execute(
+        select(day, func.count(Task.id)).where(in_subtree, Task.is_completed == True).group_by(day)
+    )
+    deltas = {date.fromisoformat(day): -count for day, count in rows}
+
+    result = db.execute(
+        update(Task).where(in_subtree).values(deleted_at=datetime.utcnow())
+        .execution_options(synchronize_session='fetch')
+    )
+    apply_daily_deltas(db, user_id, deltas)
+    return result.rowcount
+
+
+def purge_deleted_tasks(db: Session, batch_size: int = 500) -> int:
+    """
+    Физически удалить до batch_size задач, помеченных удаленными, вместе
+    с их строками task_closure (по ix_tasks_deleted_at). Делает commit,
+    чтобы не держать блокировку записи дольше одной пачки.
+    Возвращает число удаленных задач (0 - очередь пуста)
+    """
+    batch = db.execute(
+        select(Task.id).where(Task.deleted_at != None).order_by(Task.deleted_at).limit(batch_size)
+    ).scalars().all()
+    if not batch:
+        return 0
+    closure.remove_task_nodes(db, batch)
+    db.execute(delete(Task).where(Task.id.in_(batch)).execution_options(synchronize_session=False))
+    db.commit()
+    return len(batch)
+
+
 def complete_task(db: Session, task_id: int, user_id: int) -> Optional[Task]:
     """Отметить задачу как выполненную (каскадно для подзадач)"""
-    from datetime import datetime
     db_task = get_task(db, task_id, user_id)
     if not db_task:
         return None
-    def mark_completed(task: Task):
-        task.is_completed = True
-        if not task.completed_at:
-            task.completed_at = datetime.utcnow()
-        for subtask in task.subtasks:
-            mark_completed(subtask)
-    mark_completed(db_task)
+    set_subtree_completed(db, task_id, user_id, True)
+    bump_data_version(db, user_id)
     db.commit()
     db.refresh(db_task)
     return db_task
+
+
+def clone_task(db: Session, task_id: int, user_id: int, offset_days: int = 0) -> Optional[int]:
+    """
+    Скопировать задачу со всеми подзадачами рядом с оригиналом (тот же
+    родитель и список, в конце группы) одним INSERT ... SELECT; сроки сдвигаются на
+    offset_days. Копии не выполнены. Id копий назначаются в том же запросе
+    (max(id) + ранг оригинала), поэтому parent_id и task_closure копии
+    выводятся из рангов без чтения строк в Python.
+    Возвращает id копии корня (None - задача не найдена)
+    """
+    source = get_task(db, task_id, user_id)
+    if source is None:
+        return None
+    root_position = next_position(db, group_of(source))
+
+    ranks = select(Task.id, func.row_number().over(order_by=Task.id).label('rn')).where(
+        Task.id.in_(closure.subtree_ids(task_id)), Task.owner_id == user_id, LIVE_TASK
+    ).subquery()
+    parent_rank = ranks.alias()
+    base = select(func.max(Task.id)).scalar_subquery()
+    modifier = f'{offset_days:+d} days'
+
+    def shifted(column):
+        if not offset_days:
+            return column
+        # %f дает только миллисекунды: дробная часть переносится из исходной строки
+        return func.strftime('%Y-%m-%d %H:%M:%S', column, modifier).concat(func.substr(column, 20))
+
+    rows = select(
+        base + ranks.c.rn,
+        Task.title,
+        Task.description,
+        false(),
+        literal(datetime.utcnow(), Task.created_at.type),
+        shifted(Task.due_date),
+        shifted(Task.scheduled_date),
+        Task.owner_id,
+        case((Task.id == task_id, Task.parent_id), else_=base + parent_rank.c.rn),
+        Task.priority,
+        Task.task_list_id,
+        Task.descendant_count,
+        case((Task.id == task_id, root_position), else_=Task.position),
+    ).join(ranks, ranks.c.id == Task.id).outerjoin(parent_rank, parent_rank.c.id == Task.parent_id)
+    new_ids = db.execute(
+        insert(Task.__table__).from_select([
+            'id', 'title', 'description', 'is_completed', 'created_at', 'due_date', 'scheduled_date',
+            'owner_id', 'parent_id', 'priority', 'task_list_id', 'descendant_count', 'position'
+        ], rows).returning(Task.id)
+    ).scalars().all()
+
+    new_base = min(new_ids) - 1
+    new_root_id = new_base + db.execute(select(ranks.c.rn).where(ranks.c.id == task_id)).scalar()
+    closure.copy_subtree_paths(db, ranks, new_base)
+    if source.parent_id is not None:
+        closure.attach_subtree(db, new_root_id, source.parent_id)
+        closure.shift_ancestor_counts(db, new_root_id, len(new_ids), 0)
+    bump_data_version(db, user_id)
+    db.commit()
+    return new_root_id
+
+
+def set_subtree_completed(db: Session, task_id: int, user_id: int, completed: bool) -> int:
+    """
+    Отметить задачу и все ее подзадачи как выполненные / невыполненные
+    одним UPDATE по поддереву из task_closure. При выполнении уже проставленный
+    completed_at сохраняется. Статистика по дням обновляется дельтами,
+    посчитанными одним агрегирующим запросом до UPDATE, счетчики прогресса
+    предков - одним UPDATE по task_closure. Без commit.
+    Возвращает число измененных строк
+    """
+    in_subtree = and_(Task.id.in_(closure.subtree_ids(task_id)), Task.owner_id == user_id, LIVE_TASK)
+    if completed:
+        now = datetime.utcnow()
+        changed = and_(in_subtree, or_(Task.is_completed == False, Task.completed_at == None))
+        # У изменяемых выполненных задач completed_at пуст - они учтены по created_at
+        old_day = case((Task.is_completed == True, func.date(Task.created_at)), else_=null())
+        new_day = func.date(func.coalesce(Task.completed_at, now))
+        values = {'is_completed': True, 'completed_at': func.coalesce(Task.completed_at, now)}
+    else:
+        changed = and_(in_subtree, or_(Task.is_completed == True, Task.completed_at != None))
+        old_day = case(
+            (Task.is_completed == True, func.date(func.coalesce(Task.completed_at, Task.created_at))),
+            else_=null()
+        )
+        new_day = null()
+        values = {'is_completed': False, 'completed_at': None}
+
+    deltas = defaultdict(int)
+    rows = db.execute(
+        select(old_day, new_day, func.count(Task.id)).where(changed).group_by(old_day, new_day)
+    )
+    for old, new, count in rows:
+        if old is not None:
+            deltas[date.fromisoformat(old)] -= count
+        if new is not None:
+            deltas[date.fromisoformat(new)] += count
+
+    flipped = and_(in_subtree, Task.is_completed == (not completed))
+    closure.count_into_ancestors(
+        db, select(Task.id).where(flipped).correlate(None), Task.descendant_completed_count,
+        1 if completed else -1
+    )
+
+    result = db.execute(
+        update(Task).where(changed).values(**values).execution_options(synchronize_session='fetch')
+    )
+    apply_daily_deltas(db, user_id, {day: delta for day, delta in deltas.items() if delta})
+    return result.rowcount
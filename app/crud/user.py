@@ -1,6 +1,7 @@
 """
 CRUD операции для пользователя
 """
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from typing import Optional
 
@@ -67,3 +68,29 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         return None
     return user
 
+
+
+def bump_data_version(db: Session, user_id: int) -> None:
+    """
+    Увеличить версию данных задач пользователя (без commit)
+    Изменение задач меняет и коллекцию, поэтому растет и collection_version
+    """
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            data_version=User.data_version + 1,
+            collection_version=User.collection_version + 1
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_collection_version(db: Session, user_id: int) -> None:
+    """Увеличить версию коллекций пользователя (списки, достижения) без commit"""
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(collection_version=User.collection_version + 1)
+        .execution_options(synchronize_session=False)
+    )
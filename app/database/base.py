@@ -32,8 +32,11 @@ def get_db():
 def init_db():
     """Инициализация базы данных - создание таблиц"""
     from app.models.user import User
-    from app.models.task import Task
+    from app.models.task import Task, TaskClosure
     from app.models.list import TaskList
+    from app.models.stats import UserDailyStats, UserRiskSnapshot, UserPeriodStats
+    from app.models.achievements import Achievement, UserAchievement
+    from app.models.sync import ChangeLog, SyncWatermark
     # Удаляем устаревшую таблицу связи, если она существовала ранее
     with engine.connect() as conn:
         conn.execute(text("DROP TABLE IF EXISTS task_list_tasks"))
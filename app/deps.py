@@ -1,7 +1,9 @@
 """
 Dependencies для FastAPI
 """
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
@@ -41,3 +43,46 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
     """Получить активного текущего пользователя"""
     return current_user
 
+
+def get_current_superuser(current_user: User = Depends(get_current_active_user)) -> User:
+    """Получить текущего пользователя с правами администратора"""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
+
+def collection_etag(user: User) -> str:
+    """ETag коллекций пользователя: меняется при любом изменении задач, списков, достижений"""
+    return f'W/"{user.id}.{user.collection_version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match (слабое сравнение)"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags)
+
+
+def not_modified(request: Request, response: Response, etag: str) -> None:
+    """304 Not Modified, если у клиента актуальная версия, иначе проставить ETag в ответ"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+
+def check_collection_etag(
+    request: Request,
+    response: Response,
+    current_user: User = Depends(get_current_active_user)
+) -> None:
+    """
+    Условный GET по версии коллекций текущего пользователя
+    Версия уже загружена вместе с пользователем, поэтому 304 отдается без
+    запросов к задачам и спискам
+    """
+    not_modified(request, response, collection_etag(current_user))
@@ -1,7 +1,7 @@
 # python
 # file: app/models/list.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from app.database.base import Base
 
 
@@ -15,3 +15,8 @@ class TaskList(Base):
     # name should not be globally unique so multiple users can have lists with the same name
     name = Column(String, unique=False, nullable=False)
     creator_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        # Keyset pagination of a user's lists (app/crud/pagination.py)
+        Index("ix_task_lists_creator_id", "creator_id", "id"),
+    )
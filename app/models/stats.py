@@ -0,0 +1,53 @@
+"""
+Модели статистики пользователей
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Date, DateTime, Float, ForeignKey, Integer, String
+
+from app.database.base import Base
+
+
+class UserDailyStats(Base):
+    """
+    Количество выполненных задач пользователя по дням.
+    День задачи - date(coalesce(completed_at, created_at)), как в аналитике.
+    Поддерживается инкрементально в app/crud/task.py
+    """
+    __tablename__ = "user_daily_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    tasks_done = Column(Integer, nullable=False, default=0)
+
+
+class UserRiskSnapshot(Base):
+    """
+    Ежедневный снимок риска выгорания пользователя (пакетный расчет по когорте)
+    """
+    __tablename__ = "user_risk_snapshot"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    snapshot_date = Column(Date, primary_key=True)
+    days_back = Column(Integer, nullable=False)
+    risk_index = Column(Float, nullable=False)
+    category = Column(String, nullable=False)
+    downshift = Column(Float, nullable=False)
+    momentum = Column(Float, nullable=False)
+    zeros_rate = Column(Float, nullable=False)
+    streak_strain = Column(Float, nullable=False)
+    z_score = Column(Float, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UserPeriodStats(Base):
+    """
+    Агрегаты user_daily_stats по неделям (с понедельника) и месяцам.
+    Поддерживаются вместе с дневной статистикой, используются для длинных трендов
+    """
+    __tablename__ = "user_period_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    granularity = Column(String, primary_key=True)  # "week" | "month"
+    period_start = Column(Date, primary_key=True)
+    tasks_done = Column(Integer, nullable=False, default=0)
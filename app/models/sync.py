@@ -0,0 +1,73 @@
+"""
+Журнал изменений для дельта-синхронизации клиентов
+"""
+from sqlalchemy import DDL, Column, DateTime, Index, Integer, String, event, func
+
+from app.database.base import Base
+
+
+class ChangeLog(Base):
+    """
+    Запись журнала: задача или список пользователя изменены (upsert) или удалены (delete).
+    seq монотонно растет и служит курсором синхронизации.
+    Заполняется триггерами на tasks и task_lists (CHANGE_LOG_TRIGGERS), поэтому
+    учитываются и массовые UPDATE/INSERT мимо ORM
+    """
+    __tablename__ = "change_log"
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    entity = Column(String, nullable=False)  # task | list
+    entity_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)  # upsert | delete
+    changed_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    __table_args__ = (
+        Index("ix_change_log_user_seq", "user_id", "seq"),
+        {"sqlite_autoincrement": True},
+    )
+
+
+class SyncWatermark(Base):
+    """
+    Граница сжатия журнала пользователя: записи с seq <= purged_seq удалены,
+    клиенту с более старым курсором нужна полная синхронизация
+    """
+    __tablename__ = "sync_watermark"
+
+    user_id = Column(Integer, primary_key=True)
+    purged_seq = Column(Integer, nullable=False, default=0)
+
+
+def _journal_trigger(name: str, event_sql: str, table: str, owner: str, entity: str, op: str) -> str:
+    row = "old" if op == "delete" else "new"
+    return f"""CREATE TRIGGER IF NOT EXISTS {name} AFTER {event_sql} ON {table}
+        WHEN {row}.{owner} IS NOT NULL BEGIN
+        INSERT INTO change_log (user_id, entity, entity_id, op)
+        VALUES ({row}.{owner}, '{entity}', {row}.id, '{op}');
+    END"""
+
+
+# Столбцы задачи, изменение которых видно клиенту. Счетчики прогресса
+# (descendant_count, descendant_completed_count) меняются у всех предков при
+# каждом изменении подзадачи и в журнал не попадают - клиент выводит их из дерева
+TASK_SYNCED_COLUMNS = (
+    "title", "description", "due_date", "scheduled_date", "priority", "is_completed", "completed_at",
+    "parent_id", "task_list_id", "position", "deleted_at",
+)
+
+CHANGE_LOG_TRIGGERS = [
+    _journal_trigger("change_log_tasks_ai", "INSERT", "tasks", "owner_id", "task", "upsert"),
+    _journal_trigger(
+        "change_log_tasks_au", f"UPDATE OF {', '.join(TASK_SYNCED_COLUMNS)}", "tasks", "owner_id", "task", "upsert"
+    ),
+    _journal_trigger("change_log_tasks_ad", "DELETE", "tasks", "owner_id", "task", "delete"),
+    _journal_trigger("change_log_lists_ai", "INSERT", "task_lists", "creator_id", "list", "upsert"),
+    _journal_trigger("change_log_lists_au", "UPDATE", "task_lists", "creator_id", "list", "upsert"),
+    _journal_trigger("change_log_lists_ad", "DELETE", "task_lists", "creator_id", "list", "delete"),
+]
+
+# Триггеры создаются после create_all целиком (нужны tasks, task_lists и change_log),
+# в том числе для уже существующей базы
+for _statement in CHANGE_LOG_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
@@ -1,12 +1,15 @@
 """
 Модель задачи
 """
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime
+from sqlalchemy import DDL, Boolean, Column, ForeignKey, Integer, String, DateTime, Index, and_, event, false, func, or_
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
 from app.database.base import Base
 
+# Ключи position длиннее этого перебалансируются в фоне (app/crud/position.py)
+POSITION_MAX_LENGTH = 10
+
 
 class Task(Base):
     """
@@ -22,6 +25,9 @@ class Task(Base):
     completed_at = Column(DateTime, nullable=True)  # Дата завершения задачи
     due_date = Column(DateTime, nullable=True)
     scheduled_date = Column(DateTime, nullable=True)  # Планируемая дата выполнения
+    # Метка удаления: удаленная задача скрыта из всех выборок, строку
+    # затем физически удаляет фоновая очистка (app/core/maintenance.py)
+    deleted_at = Column(DateTime, nullable=True)
     
     # Связь с пользователем
     owner_id = Column(Integer, ForeignKey("users.id"))
@@ -34,6 +40,94 @@ class Task(Base):
     # Дополнительные поля для StudyFlow
     priority = Column(Integer, default=1)  # 1 - низкая, 2 - средняя, 3 - высокая
 
+    # Прогресс подзадач: число неудаленных потомков и выполненных из них.
+    # Поддерживаются при изменении дерева (app/crud/closure.py), сверка -
+    # python manage.py check-descendant-counts
+    descendant_count = Column(Integer, nullable=False, default=0, server_default="0")
+    descendant_completed_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Ручной порядок среди задач списка / подзадач родителя: дробный
+    # лексикографический ключ (app/crud/position.py), NULL - задачи до его появления
+    position = Column(String, nullable=True)
+
     # Only root tasks can belong to a TaskList
     task_list_id = Column(Integer, ForeignKey("task_lists.id", ondelete="SET NULL"), nullable=True)
     task_list = relationship("TaskList", backref="tasks")
+
+    __table_args__ = (
+        # Выборка выполненных задач пользователя за период (аналитика)
+        Index("ix_tasks_owner_completed_at", "owner_id", "is_completed", "completed_at"),
+        # Курсорная пагинация списка задач (app/crud/pagination.py)
+        Index("ix_tasks_owner_created_id", "owner_id", "created_at", "id"),
+        Index("ix_tasks_owner_due_id", "owner_id", "due_date", "id"),
+        # Повестка и срочность: частичные индексы только по открытым неудаленным
+        # задачам (условие запроса должно содержать OPEN_TASK, см. app/crud/task.py)
+        Index("ix_tasks_open_due", "owner_id", "due_date",
+              sqlite_where=and_(is_completed == false(), deleted_at == None)),
+        Index("ix_tasks_open_scheduled", "owner_id", "scheduled_date",
+              sqlite_where=and_(is_completed == false(), deleted_at == None)),
+        Index("ix_tasks_open_priority_due", "owner_id", "priority", "due_date",
+              sqlite_where=and_(is_completed == false(), deleted_at == None)),
+        # Сводка счетчиков: покрывающий индекс в порядке GROUP BY (get_task_summary)
+        Index(
+            "ix_tasks_owner_summary",
+            "owner_id", "task_list_id", "priority", "is_completed", "due_date", "completed_at", "deleted_at"
+        ),
+        # Очередь фоновой очистки удаленных задач
+        Index("ix_tasks_deleted_at", "deleted_at", sqlite_where=deleted_at != None),
+        # Ручной порядок задач списка и подзадач
+        Index("ix_tasks_list_position", "task_list_id", "position"),
+        Index("ix_tasks_parent_position", "parent_id", "position"),
+        # Группы, которым нужна перебалансировка ключей (условие - NEEDS_REBALANCE)
+        Index(
+            "ix_tasks_position_rebalance", "owner_id", "parent_id", "task_list_id",
+            sqlite_where=or_(position == None, func.length(position) > POSITION_MAX_LENGTH)
+        ),
+    )
+
+
+class TaskClosure(Base):
+    """
+    Таблица замыкания иерархии задач: строка на каждую пару (предок, потомок),
+    включая саму задачу с depth = 0. Поддерживается в app/crud/closure.py
+    """
+    __tablename__ = "task_closure"
+
+    ancestor_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Предки задачи (PK покрывает выборку потомков)
+        Index("ix_task_closure_descendant", "descendant_id", "depth"),
+    )
+
+
+# Полнотекстовый поиск по title/description: FTS5-таблица с внешним контентом
+# (tasks), синхронизируется триггерами. Создается после create_all (как и
+# CHANGE_LOG_TRIGGERS), в том числе для уже существующей базы; индекс
+# заполняется при старте (ensure_search_index) или
+# python manage.py rebuild-search-index
+TASKS_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description,
+        content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+]
+
+for _statement in TASKS_FTS_DDL:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(Base.metadata, "before_drop", DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"))
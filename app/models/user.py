@@ -26,3 +26,7 @@ class User(Base):
     streak_days = Column(Integer, default=0)
     last_login_date = Column(Date, nullable=True)
     login_days = Column(Integer, default=0)
+    # Версия данных задач пользователя, растет при каждом изменении задач
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Версия коллекций пользователя (задачи, списки, достижения) для ETag
+    collection_version = Column(Integer, nullable=False, default=0, server_default="0")
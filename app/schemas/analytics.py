@@ -3,6 +3,7 @@ Pydantic схемы для аналитики продуктивности
 """
 from pydantic import BaseModel
 from typing import List, Dict, Optional
+from datetime import date
 
 
 class WeekdayProductivity(BaseModel):
@@ -33,6 +34,15 @@ class BurnoutRisk(BaseModel):
     components: BurnoutComponents
 
 
+class RiskHistoryPoint(BaseModel):
+    """Индекс риска выгорания на конкретный день"""
+    date: str
+    index: float
+    category: str
+    z_score: float
+    components: BurnoutComponents
+
+
 class MovingAverages(BaseModel):
     """Скользящие средние"""
     mean_7: float
@@ -76,3 +86,50 @@ class AnalyticsDashboard(BaseModel):
     recommendation: ProductivityRecommendation
     warning: Optional[BurnoutWarning] = None
 
+
+class RiskSnapshot(BaseModel):
+    """Снимок риска выгорания пользователя из пакетного расчета"""
+    user_id: int
+    snapshot_date: date
+    days_back: int
+    risk_index: float
+    category: str
+    downshift: float
+    momentum: float
+    zeros_rate: float
+    streak_strain: float
+    z_score: float
+
+    class Config:
+        from_attributes = True
+
+
+class CohortScoringResult(BaseModel):
+    """Результат пакетного расчета риска по когорте"""
+    snapshot_date: date
+    days_back: int
+    users_scored: int
+
+
+class MetricsCacheStats(BaseModel):
+    """Счетчики кэша метрик"""
+    cache_size: int
+    cache_hits: int
+    cache_misses: int
+    computations: int  # Фактически выполненные вычисления метрик
+    coalesced: int  # Запросы, дождавшиеся чужого вычисления (сэкономленные)
+
+
+class TrendPoint(BaseModel):
+    """Выполненные задачи за период"""
+    period_start: date
+    days: int  # Дней периода внутри окна
+    tasks_done: int
+    mean_per_day: float
+
+
+class ProductivityTrend(BaseModel):
+    """Тренд выполненных задач по периодам"""
+    granularity: str  # "day" | "week" | "month" | "quarter" | "year"
+    source: str  # Уровень пирамиды статистики, из которого построен тренд
+    points: List[TrendPoint]
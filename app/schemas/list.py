@@ -1,8 +1,8 @@
 # python
 # file: app/schemas/list.py
 
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 
 class TaskListBase(BaseModel):
@@ -28,3 +28,19 @@ class TaskList(TaskListBase):
 
     class Config:
         from_attributes = True
+
+
+class TaskListBulkRequest(BaseModel):
+    """Schema for changing list membership of many root tasks at once.
+    move takes tasks from this list into target_list_id.
+    """
+    op: Literal["add", "remove", "move"]
+    task_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    target_list_id: Optional[int] = None
+
+
+class TaskListBulkResult(BaseModel):
+    """Result for one task id of a bulk membership change."""
+    task_id: int
+    ok: bool
+    error: Optional[str] = None
@@ -0,0 +1,19 @@
+"""
+Pydantic схемы синхронизации
+"""
+from typing import List
+
+from pydantic import BaseModel
+
+from app.schemas.list import TaskList
+from app.schemas.task import Task
+
+
+class SyncChanges(BaseModel):
+    """Изменения после курсора: актуальные задачи/списки и id удаленных"""
+    cursor: int
+    has_more: bool
+    tasks: List[Task]
+    lists: List[TaskList]
+    deleted_tasks: List[int]
+    deleted_lists: List[int]
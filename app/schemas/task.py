@@ -1,8 +1,8 @@
 """
 Pydantic схемы для задачи
 """
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 from datetime import datetime
 
 
@@ -40,6 +40,11 @@ class TaskInDB(TaskBase):
     is_completed: bool
     created_at: datetime
     owner_id: int
+    # Прогресс подзадач (все уровни вложенности)
+    descendant_count: int = 0
+    descendant_completed_count: int = 0
+    # Ключ ручного порядка среди соседей (сравнивается как строка)
+    position: Optional[str] = None
     
     class Config:
         from_attributes = True
@@ -48,3 +53,74 @@ class TaskInDB(TaskBase):
 class Task(TaskInDB):
     """Публичная схема задачи"""
     pass
+
+
+class TaskTree(Task):
+    """Задача со всеми подзадачами (вложенно)"""
+    subtasks: List["TaskTree"] = []
+
+
+class TaskCounts(BaseModel):
+    """Счетчики задач"""
+    total: int
+    open: int
+    overdue: int
+    completed_today: int
+
+
+class PriorityCounts(TaskCounts):
+    """Счетчики задач одного приоритета"""
+    priority: Optional[int] = None
+
+
+class ListCounts(TaskCounts):
+    """Счетчики задач одного списка (None - задачи вне списков)"""
+    task_list_id: Optional[int] = None
+
+
+class TaskSummary(TaskCounts):
+    """Сводка для главного экрана"""
+    by_priority: List[PriorityCounts]
+    by_list: List[ListCounts]
+
+
+class TaskMove(BaseModel):
+    """Перестановка задачи: сразу после after_id и / или перед before_id"""
+    after_id: Optional[int] = None
+    before_id: Optional[int] = None
+
+
+class TaskSearchHit(Task):
+    """Результат полнотекстового поиска: задача и подсвеченные совпадения"""
+    rank: float
+    title_highlight: str
+    snippet: Optional[str] = None
+
+
+class TaskBatchOperation(BaseModel):
+    """
+    Одна операция пакета
+    create - поле task; update - task_id и changes; complete/delete - task_id.
+    ref / parent_ref позволяют создать в одном пакете задачу и ее подзадачи
+    """
+    op: Literal["create", "update", "complete", "delete"]
+    task_id: Optional[int] = None
+    task: Optional[TaskCreate] = None
+    changes: Optional[TaskUpdate] = None
+    ref: Optional[str] = None
+    parent_ref: Optional[str] = None
+
+
+class TaskBatchRequest(BaseModel):
+    """Пакет операций над задачами"""
+    operations: List[TaskBatchOperation] = Field(..., max_length=1000)
+
+
+class TaskBatchResult(BaseModel):
+    """Результат одной операции пакета"""
+    index: int
+    op: str
+    ok: bool
+    task_id: Optional[int] = None
+    ref: Optional[str] = None
+    error: Optional[str] = None
@@ -4,9 +4,17 @@ from app.api import tasks
 from app.api.achievements import router as achievements_router
 from app.api.auth import router as auth_router
 from app.api.analytics import router as analytics_router
-from app.database.base import engine
+from app.api.list import router as list_router
+from app.api.sync import router as sync_router
+from app.database.base import SessionLocal, engine
 from app.database.base import Base
 from app.api import achievements
+from app.analytics.pool import start_pool, shutdown_pool
+from app.core.maintenance import start_maintenance, stop_maintenance
+from app.core.config import settings
+from app.crud.closure import ensure_task_closure
+from app.crud.search import ensure_search_index
+from app.crud.stats import ensure_daily_stats
 
 app = FastAPI(title="Main App")
 
@@ -16,11 +24,30 @@ app.mount("/static", StaticFiles(directory="app/static"))
 def on_startup():
     Base.metadata.create_all(bind=engine)
     achievements.init_achievements()
+    db = SessionLocal()
+    try:
+        ensure_task_closure(db)
+        ensure_search_index(db)
+        ensure_daily_stats(db)
+    finally:
+        db.close()
+    start_pool(settings.ANALYTICS_POOL_WORKERS, settings.ANALYTICS_POOL_QUEUE)
+    start_maintenance(
+        settings.TASK_MAINTENANCE_INTERVAL_SECONDS, settings.TASK_PURGE_BATCH_SIZE, settings.SYNC_RETENTION_DAYS
+    )
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_maintenance()
+    shutdown_pool()
 
 app.include_router(achievements_router, prefix="/achievements")
+# Аналитика - до задач: иначе /metrics, /risk и т.д. перехватывает /{task_id}
+app.include_router(analytics_router)
 app.include_router(tasks.router)
 app.include_router(auth_router, prefix="/auth")
-app.include_router(analytics_router)
+app.include_router(list_router, prefix="/lists")
+app.include_router(sync_router, prefix="/sync")
 
 @app.get("/")
 def root():
@@ -0,0 +1,191 @@
+"""
+Служебные команды StudyFlow
+
+Запуск: python manage.py <command>
+"""
+import argparse
+import sys
+
+from app.database.base import SessionLocal, init_db
+
+
+def rebuild_daily_stats(args) -> int:
+    """Пересобрать rollup user_daily_stats по таблице tasks"""
+    from app.crud.stats import rebuild_daily_stats as rebuild
+    db = SessionLocal()
+    try:
+        rows = rebuild(db)
+    finally:
+        db.close()
+    print(f"user_daily_stats rebuilt: {rows} rows")
+    return 0
+
+
+def check_daily_stats(args) -> int:
+    """Сверить user_daily_stats с tasks, а недельный/месячный уровни - с user_daily_stats"""
+    from app.crud.stats import check_daily_stats as check, check_period_stats
+    db = SessionLocal()
+    try:
+        mismatches = check(db, user_id=args.user_id)
+        period_mismatches = check_period_stats(db, user_id=args.user_id)
+    finally:
+        db.close()
+    for user_id, day, stored, actual in mismatches:
+        print(f"user {user_id} {day.isoformat()}: rollup={stored} tasks={actual}")
+    for user_id, granularity, start, stored, actual in period_mismatches:
+        print(f"user {user_id} {granularity} {start.isoformat()}: rollup={stored} daily={actual}")
+    total = len(mismatches) + len(period_mismatches)
+    print(f"{total} mismatches")
+    return 1 if total else 0
+
+
+def non_negative_int(value: str) -> int:
+    """Тип аргумента argparse: целое >= 0"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {number}")
+    return number
+
+
+def score_cohort(args) -> int:
+    """Посчитать риск выгорания для всех пользователей (user_risk_snapshot)"""
+    from app.crud.analytics import score_cohort_risk
+    db = SessionLocal()
+    try:
+        users_scored = score_cohort_risk(db, days_back=args.days_back)
+    finally:
+        db.close()
+    print(f"user_risk_snapshot: {users_scored} users scored")
+    return 0
+
+
+def rebuild_task_closure(args) -> int:
+    """Пересобрать task_closure по parent_id"""
+    from app.crud.closure import rebuild_task_closure as rebuild
+    db = SessionLocal()
+    try:
+        rows = rebuild(db)
+    finally:
+        db.close()
+    print(f"task_closure rebuilt: {rows} rows")
+    return 0
+
+
+def check_task_closure(args) -> int:
+    """Сверить task_closure с parent_id"""
+    from app.crud.closure import check_task_closure as check
+    db = SessionLocal()
+    try:
+        mismatches = check(db)
+    finally:
+        db.close()
+    print(f"{mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+def rebuild_descendant_counts(args) -> int:
+    """Пересчитать счетчики прогресса подзадач по task_closure"""
+    from app.crud.closure import rebuild_descendant_counts as rebuild
+    db = SessionLocal()
+    try:
+        rows = rebuild(db)
+    finally:
+        db.close()
+    print(f"descendant counts rebuilt: {rows} tasks")
+    return 0
+
+
+def check_descendant_counts(args) -> int:
+    """Сверить счетчики прогресса подзадач с task_closure"""
+    from app.crud.closure import check_descendant_counts as check
+    db = SessionLocal()
+    try:
+        mismatches = check(db)
+    finally:
+        db.close()
+    for task_id, stored, actual, stored_completed, actual_completed in mismatches:
+        print(f"task {task_id}: descendants={stored}/{actual} completed={stored_completed}/{actual_completed}")
+    print(f"{len(mismatches)} mismatches")
+    return 1 if mismatches else 0
+
+
+def rebuild_search_index(args) -> int:
+    """Создать полнотекстовый индекс tasks_fts (если нет) и переиндексировать задачи"""
+    from app.crud.search import rebuild_search_index as rebuild
+    db = SessionLocal()
+    try:
+        tasks_indexed = rebuild(db)
+    finally:
+        db.close()
+    print(f"tasks_fts rebuilt: {tasks_indexed} tasks")
+    return 0
+
+
+def compact_change_log(args) -> int:
+    """Удалить записи журнала синхронизации старше SYNC_RETENTION_DAYS"""
+    from app.core.config import settings
+    from app.crud.sync import compact_change_log as compact
+    db = SessionLocal()
+    try:
+        deleted = compact(db, retention_days=args.retention_days or settings.SYNC_RETENTION_DAYS)
+    finally:
+        db.close()
+    print(f"change_log compacted: {deleted} entries removed")
+    return 0
+
+
+def purge_deleted_tasks(args) -> int:
+    """Физически удалить задачи, помеченные удаленными"""
+    from app.core.config import settings
+    from app.core.maintenance import purge_all
+    purged = purge_all(batch_size=args.batch_size or settings.TASK_PURGE_BATCH_SIZE)
+    print(f"tasks purged: {purged}")
+    return 0
+
+
+def rebalance_positions(args) -> int:
+    """Перебалансировать ключи ручного порядка задач (и выдать ключи задачам без них)"""
+    from app.core.maintenance import rebalance_all
+    groups = rebalance_all()
+    print(f"positions rebalanced: {groups} groups")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="StudyFlow management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("rebuild-daily-stats", help=rebuild_daily_stats.__doc__).set_defaults(func=rebuild_daily_stats)
+
+    check_parser = subparsers.add_parser("check-daily-stats", help=check_daily_stats.__doc__)
+    check_parser.add_argument("--user-id", type=int, default=None)
+    check_parser.set_defaults(func=check_daily_stats)
+
+    score_parser = subparsers.add_parser("score-cohort", help=score_cohort.__doc__)
+    score_parser.add_argument("--days-back", type=non_negative_int, default=60)
+    score_parser.set_defaults(func=score_cohort)
+
+    subparsers.add_parser("rebuild-task-closure", help=rebuild_task_closure.__doc__).set_defaults(func=rebuild_task_closure)
+    subparsers.add_parser("check-task-closure", help=check_task_closure.__doc__).set_defaults(func=check_task_closure)
+    subparsers.add_parser("rebuild-descendant-counts", help=rebuild_descendant_counts.__doc__).set_defaults(func=rebuild_descendant_counts)
+    subparsers.add_parser("check-descendant-counts", help=check_descendant_counts.__doc__).set_defaults(func=check_descendant_counts)
+
+    subparsers.add_parser("rebuild-search-index", help=rebuild_search_index.__doc__).set_defaults(func=rebuild_search_index)
+
+    compact_parser = subparsers.add_parser("compact-change-log", help=compact_change_log.__doc__)
+    compact_parser.add_argument("--retention-days", type=int, default=None)
+    compact_parser.set_defaults(func=compact_change_log)
+
+    purge_parser = subparsers.add_parser("purge-deleted-tasks", help=purge_deleted_tasks.__doc__)
+    purge_parser.add_argument("--batch-size", type=int, default=None)
+    purge_parser.set_defaults(func=purge_deleted_tasks)
+
+    subparsers.add_parser("rebalance-positions", help=rebalance_positions.__doc__).set_defaults(func=rebalance_positions)
+
+    args = parser.parse_args()
+    init_db()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+-- Композитный индекс для дневной агрегации выполненных задач (app/crud/analytics.py)
+CREATE INDEX IF NOT EXISTS ix_tasks_owner_completed_at ON tasks (owner_id, is_completed, completed_at);
@@ -0,0 +1,2 @@
+-- Версия данных пользователя для кэша метрик аналитики (app/analytics/cache.py)
+ALTER TABLE users ADD COLUMN data_version INTEGER NOT NULL DEFAULT 0;
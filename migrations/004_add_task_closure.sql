@@ -0,0 +1,19 @@
+-- Таблица замыкания иерархии задач (app/crud/closure.py)
+CREATE TABLE IF NOT EXISTS task_closure (
+    ancestor_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES tasks (id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS ix_task_closure_descendant ON task_closure (descendant_id, depth);
+
+-- Заполнение по существующим parent_id (то же делает python manage.py rebuild-task-closure)
+DELETE FROM task_closure;
+INSERT INTO task_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE paths (ancestor_id, descendant_id, depth) AS (
+    SELECT id, id, 0 FROM tasks
+    UNION ALL
+    SELECT paths.ancestor_id, tasks.id, paths.depth + 1
+    FROM tasks JOIN paths ON tasks.parent_id = paths.descendant_id
+)
+SELECT ancestor_id, descendant_id, depth FROM paths;
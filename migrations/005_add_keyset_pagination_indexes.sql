@@ -0,0 +1,4 @@
+-- Композитные индексы для курсорной пагинации (app/crud/pagination.py)
+CREATE INDEX IF NOT EXISTS ix_tasks_owner_created_id ON tasks (owner_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_tasks_owner_due_id ON tasks (owner_id, due_date, id);
+CREATE INDEX IF NOT EXISTS ix_task_lists_creator_id ON task_lists (creator_id, id);
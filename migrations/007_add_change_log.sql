@@ -0,0 +1,51 @@
+-- Журнал изменений для GET /sync/changes (app/crud/sync.py); триггеры совпадают с CHANGE_LOG_TRIGGERS в app/models/sync.py
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    entity VARCHAR NOT NULL,
+    entity_id INTEGER NOT NULL,
+    op VARCHAR NOT NULL,
+    changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS ix_change_log_user_seq ON change_log (user_id, seq);
+
+CREATE TABLE IF NOT EXISTS sync_watermark (
+    user_id INTEGER PRIMARY KEY,
+    purged_seq INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS change_log_tasks_ai AFTER INSERT ON tasks
+    WHEN new.owner_id IS NOT NULL BEGIN
+    INSERT INTO change_log (user_id, entity, entity_id, op)
+    VALUES (new.owner_id, 'task', new.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_tasks_au AFTER UPDATE ON tasks
+    WHEN new.owner_id IS NOT NULL BEGIN
+    INSERT INTO change_log (user_id, entity, entity_id, op)
+    VALUES (new.owner_id, 'task', new.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_tasks_ad AFTER DELETE ON tasks
+    WHEN old.owner_id IS NOT NULL BEGIN
+    INSERT INTO change_log (user_id, entity, entity_id, op)
+    VALUES (old.owner_id, 'task', old.id, 'delete');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_lists_ai AFTER INSERT ON task_lists
+    WHEN new.creator_id IS NOT NULL BEGIN
+    INSERT INTO change_log (user_id, entity, entity_id, op)
+    VALUES (new.creator_id, 'list', new.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_lists_au AFTER UPDATE ON task_lists
+    WHEN new.creator_id IS NOT NULL BEGIN
+    INSERT INTO change_log (user_id, entity, entity_id, op)
+    VALUES (new.creator_id, 'list', new.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS change_log_lists_ad AFTER DELETE ON task_lists
+    WHEN old.creator_id IS NOT NULL BEGIN
+    INSERT INTO change_log (user_id, entity, entity_id, op)
+    VALUES (old.creator_id, 'list', old.id, 'delete');
+END;
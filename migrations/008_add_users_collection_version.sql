@@ -0,0 +1,2 @@
+-- Версия коллекций пользователя для ETag / If-None-Match (app/deps.py)
+ALTER TABLE users ADD COLUMN collection_version INTEGER NOT NULL DEFAULT 0;
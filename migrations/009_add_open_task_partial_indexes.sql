@@ -0,0 +1,4 @@
+-- Частичные индексы по открытым задачам для повестки и срочности (app/crud/task.py: get_agenda, get_urgent_tasks)
+CREATE INDEX IF NOT EXISTS ix_tasks_open_due ON tasks (owner_id, due_date) WHERE is_completed = 0;
+CREATE INDEX IF NOT EXISTS ix_tasks_open_scheduled ON tasks (owner_id, scheduled_date) WHERE is_completed = 0;
+CREATE INDEX IF NOT EXISTS ix_tasks_open_priority_due ON tasks (owner_id, priority, due_date) WHERE is_completed = 0;
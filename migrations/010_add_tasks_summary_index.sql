@@ -0,0 +1,2 @@
+-- Покрывающий индекс для GET /tasks/summary (app/crud/task.py: get_task_summary)
+CREATE INDEX IF NOT EXISTS ix_tasks_owner_summary ON tasks (owner_id, task_list_id, priority, is_completed, due_date, completed_at);
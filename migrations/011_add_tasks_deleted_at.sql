@@ -0,0 +1,12 @@
+-- Мягкое удаление задач: метка deleted_at и очередь фоновой очистки (app/core/purger.py)
+ALTER TABLE tasks ADD COLUMN deleted_at DATETIME;
+CREATE INDEX IF NOT EXISTS ix_tasks_deleted_at ON tasks (deleted_at) WHERE deleted_at IS NOT NULL;
+-- Частичные и покрывающий индексы учитывают метку удаления
+DROP INDEX IF EXISTS ix_tasks_open_due;
+DROP INDEX IF EXISTS ix_tasks_open_scheduled;
+DROP INDEX IF EXISTS ix_tasks_open_priority_due;
+DROP INDEX IF EXISTS ix_tasks_owner_summary;
+CREATE INDEX IF NOT EXISTS ix_tasks_open_due ON tasks (owner_id, due_date) WHERE is_completed = 0 AND deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_tasks_open_scheduled ON tasks (owner_id, scheduled_date) WHERE is_completed = 0 AND deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_tasks_open_priority_due ON tasks (owner_id, priority, due_date) WHERE is_completed = 0 AND deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS ix_tasks_owner_summary ON tasks (owner_id, task_list_id, priority, is_completed, due_date, completed_at, deleted_at);
@@ -0,0 +1,13 @@
+-- Счетчики прогресса подзадач (app/crud/closure.py); заполнение - то же, что python manage.py rebuild-descendant-counts
+ALTER TABLE tasks ADD COLUMN descendant_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE tasks ADD COLUMN descendant_completed_count INTEGER NOT NULL DEFAULT 0;
+UPDATE tasks SET
+    descendant_count = (
+        SELECT count(*) FROM task_closure JOIN tasks AS node ON node.id = task_closure.descendant_id
+        WHERE task_closure.ancestor_id = tasks.id AND task_closure.depth > 0 AND node.deleted_at IS NULL
+    ),
+    descendant_completed_count = (
+        SELECT count(*) FROM task_closure JOIN tasks AS node ON node.id = task_closure.descendant_id
+        WHERE task_closure.ancestor_id = tasks.id AND task_closure.depth > 0 AND node.deleted_at IS NULL
+            AND node.is_completed = 1
+    );
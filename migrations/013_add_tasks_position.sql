@@ -0,0 +1,6 @@
+-- Ручной порядок задач (app/crud/position.py). Ключи существующим задачам выдает
+-- фоновое обслуживание или python manage.py rebalance-positions
+ALTER TABLE tasks ADD COLUMN position VARCHAR;
+CREATE INDEX IF NOT EXISTS ix_tasks_list_position ON tasks (task_list_id, position);
+CREATE INDEX IF NOT EXISTS ix_tasks_parent_position ON tasks (parent_id, position);
+CREATE INDEX IF NOT EXISTS ix_tasks_position_rebalance ON tasks (owner_id, parent_id, task_list_id) WHERE position IS NULL OR length(position) > 10;
@@ -0,0 +1,8 @@
+-- Журнал изменений: триггер обновления задач срабатывает только на видимые клиенту
+-- столбцы (TASK_SYNCED_COLUMNS в app/models/sync.py), а не на счетчики прогресса предков
+DROP TRIGGER IF EXISTS change_log_tasks_au;
+CREATE TRIGGER change_log_tasks_au AFTER UPDATE OF title, description, due_date, scheduled_date, priority, is_completed, completed_at, parent_id, task_list_id, position, deleted_at ON tasks
+    WHEN new.owner_id IS NOT NULL BEGIN
+    INSERT INTO change_log (user_id, entity, entity_id, op)
+    VALUES (new.owner_id, 'task', new.id, 'upsert');
+END;
@@ -0,0 +1,58 @@
+"""
+Общие фикстуры тестов: временная база SQLite и клиент приложения
+
+Переменные окружения задаются до импорта приложения: движок базы создается
+при импорте app.database.base. Фоновое обслуживание и пул аналитики в
+тестах не запускаются (startup не вызывается, таблицы создает фикстура).
+"""
+import os
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="studyflow-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["TASK_MAINTENANCE_INTERVAL_SECONDS"] = "0"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from app.database.base import Base, SessionLocal, engine
+
+
+@pytest.fixture(autouse=True)
+def database():
+    """Чистая схема на каждый тест"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def register(client):
+    """Зарегистрировать пользователя и вернуть заголовки авторизации"""
+    def _register(username: str = "student"):
+        client.post("/auth/register", json={
+            "email": f"{username}@example.com", "username": username, "password": "secret"
+        })
+        response = client.post("/auth/login", json={"username": username, "password": "secret"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return _register
+
+
+@pytest.fixture
+def headers(register):
+    return register()
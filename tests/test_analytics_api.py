@@ -0,0 +1,33 @@
+"""
+Проверка параметров API аналитики
+"""
+import pytest
+
+from app.models.user import User
+
+DAYS_BACK_ENDPOINTS = [
+    ("get", "/metrics"), ("get", "/dashboard"), ("get", "/risk"), ("get", "/risk/history"),
+    ("get", "/trend"), ("get", "/recommendations"), ("post", "/risk/cohort"),
+]
+
+
+@pytest.fixture
+def admin_headers(db, headers):
+    """Заголовки пользователя с правами администратора (нужны для /risk/cohort)"""
+    db.query(User).update({"is_superuser": True})
+    db.commit()
+    return headers
+
+
+@pytest.mark.parametrize("method, path", DAYS_BACK_ENDPOINTS)
+def test_negative_days_back_is_rejected(client, admin_headers, method, path):
+    response = client.request(method, path, params={"days_back": -1}, headers=admin_headers)
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize("method, path", DAYS_BACK_ENDPOINTS)
+def test_zero_days_back_is_accepted(client, admin_headers, method, path):
+    task_id = client.post("/", json={"title": "done"}, headers=admin_headers).json()["id"]
+    client.post(f"/{task_id}/complete", headers=admin_headers)
+    response = client.request(method, path, params={"days_back": 0}, headers=admin_headers)
+    assert response.status_code == 200
@@ -0,0 +1,99 @@
+"""
+Пакетные операции над задачами (POST /batch)
+"""
+from app.crud.closure import check_descendant_counts, check_task_closure
+from app.models.task import Task
+
+
+def batch(client, headers, *operations):
+    return client.post("/batch", json={"operations": list(operations)}, headers=headers)
+
+
+def create(title, **fields):
+    return {"op": "create", "task": {"title": title}, **fields}
+
+
+def test_refs_build_subtree(db, client, headers):
+    response = batch(
+        client, headers,
+        create("course", ref="course"),
+        create("chapter 1", ref="ch1", parent_ref="course"),
+        create("section 1.1", parent_ref="ch1"),
+        create("chapter 2", parent_ref="course"),
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert all(result["ok"] for result in results)
+    assert [result["ref"] for result in results] == ["course", "ch1", None, None]
+
+    tree = client.get(f"/{results[0]['task_id']}/tree", headers=headers).json()
+    assert tree["descendant_count"] == 3
+    assert [child["title"] for child in tree["subtasks"]] == ["chapter 1", "chapter 2"]
+    assert [child["id"] for child in tree["subtasks"][0]["subtasks"]] == [results[2]["task_id"]]
+    assert check_task_closure(db) == 0
+    assert check_descendant_counts(db) == []
+
+
+def test_bad_parent_ref_rejects_whole_batch(db, client, headers):
+    existing = client.post("/", json={"title": "existing"}, headers=headers).json()["id"]
+    for operations in (
+        [create("a", ref="a"), {"op": "complete", "task_id": existing}, create("b", parent_ref="missing")],
+        # Ссылка вперед: ref объявлен позже
+        [create("b", parent_ref="a"), create("a", ref="a")],
+        [create("a", ref="a"), create("b", parent_ref="a", task={"title": "b", "parent_id": existing})],
+    ):
+        response = batch(client, headers, *operations)
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid parent_ref"
+
+    response = batch(client, headers, create("a", ref="a"), create("b", ref="a"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Duplicate ref"
+
+    db.expire_all()
+    assert [task.title for task in db.query(Task)] == ["existing"]
+    assert db.get(Task, existing).is_completed is False
+
+
+def test_failed_parent_skips_its_subtasks(db, client, headers):
+    response = batch(
+        client, headers,
+        create("good", ref="good"),
+        {"op": "create", "ref": "bad", "task": {"title": "bad", "task_list_id": 10 ** 6}},
+        create("orphan", parent_ref="bad"),
+        create("child", parent_ref="good"),
+    )
+    results = response.json()
+    assert [(result["ok"], result["error"]) for result in results] == [
+        (True, None), (False, "invalid_list"), (False, "invalid_parent"), (True, None)
+    ]
+    assert results[2]["task_id"] is None
+    db.expire_all()
+    assert sorted(task.title for task in db.query(Task)) == ["child", "good"]
+
+
+def test_counters_for_batch_subtrees_under_existing_tasks(db, client, headers):
+    root = client.post("/", json={"title": "root"}, headers=headers).json()["id"]
+    response = batch(
+        client, headers,
+        create("a", ref="a", task={"title": "a", "parent_id": root}),
+        create("a1", parent_ref="a"),
+        create("a2", ref="a2", parent_ref="a"),
+        create("a2x", parent_ref="a2"),
+    )
+    ids = [result["task_id"] for result in response.json()]
+    assert check_task_closure(db) == 0
+    assert check_descendant_counts(db) == []
+    assert client.get(f"/{root}", headers=headers).json()["descendant_count"] == 4
+
+    batch(
+        client, headers,
+        {"op": "complete", "task_id": ids[2]},
+        {"op": "delete", "task_id": ids[1]},
+        {"op": "update", "task_id": ids[2], "changes": {"parent_id": root}},
+    )
+    db.expire_all()
+    assert check_task_closure(db) == 0
+    assert check_descendant_counts(db) == []
+    root_task = client.get(f"/{root}", headers=headers).json()
+    assert (root_task["descendant_count"], root_task["descendant_completed_count"]) == (3, 2)
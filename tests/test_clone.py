@@ -0,0 +1,46 @@
+"""
+Копирование задачи с поддеревом (POST /{task_id}/clone)
+"""
+from datetime import datetime, timedelta
+
+
+def shape(node):
+    """Поддерево без id: названия и сроки по уровням"""
+    return [(child["title"], child["due_date"], child["scheduled_date"], shape(child))
+            for child in node["subtasks"]]
+
+
+def shift(value, days):
+    return (datetime.fromisoformat(value) + timedelta(days=days)).isoformat() if value else None
+
+
+def test_clone_with_offset_keeps_microseconds_and_shape(client, headers):
+    due = datetime(2026, 3, 1, 9, 30, 15, 123456)
+    root = client.post("/", json={"title": "course", "due_date": due.isoformat()}, headers=headers).json()
+    week = client.post("/", json={
+        "title": "week 1", "parent_id": root["id"],
+        "due_date": (due + timedelta(days=7)).isoformat(),
+        "scheduled_date": datetime(2026, 3, 2, 8, 0, 0, 1).isoformat(),
+    }, headers=headers).json()
+    client.post("/", json={"title": "reading", "parent_id": week["id"]}, headers=headers)
+    client.post("/", json={"title": "quiz", "parent_id": week["id"],
+                           "due_date": (due + timedelta(days=5)).isoformat()}, headers=headers)
+    client.post(f"/{week['id']}/complete", headers=headers)
+
+    response = client.post(f"/{root['id']}/clone", params={"offset_days": 14}, headers=headers)
+    assert response.status_code == 201
+    copy = response.json()
+    original = client.get(f"/{root['id']}/tree", headers=headers).json()
+
+    assert copy["id"] != original["id"]
+    assert copy["due_date"] == shift(original["due_date"], 14) == "2026-03-15T09:30:15.123456"
+    assert copy["descendant_count"] == original["descendant_count"] == 3
+    assert copy["descendant_completed_count"] == 0
+
+    def expected(node):
+        return [(child["title"], shift(child["due_date"], 14), shift(child["scheduled_date"], 14),
+                 expected(child)) for child in node["subtasks"]]
+
+    assert shape(copy) == expected(original)
+    assert all(not child["is_completed"] for child in copy["subtasks"])
+    assert copy["subtasks"][0]["scheduled_date"] == "2026-03-16T08:00:00.000001"
@@ -0,0 +1,87 @@
+"""
+Счетчики прогресса (descendant_count / descendant_completed_count) и
+task_closure остаются согласованными на каждом пути изменения дерева
+"""
+import pytest
+
+from app.crud.closure import check_descendant_counts, check_task_closure
+from app.crud.task import purge_deleted_tasks
+
+
+def assert_consistent(db):
+    db.expire_all()
+    assert check_descendant_counts(db) == []
+    assert check_task_closure(db) == 0
+
+
+@pytest.fixture
+def tree(client, headers):
+    """root -> (a -> (a1, a2), b); other - отдельный корень"""
+    def create(title, parent_id=None):
+        response = client.post("/", json={"title": title, "parent_id": parent_id}, headers=headers)
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    root = create("root")
+    a = create("a", root)
+    return {"root": root, "a": a, "a1": create("a1", a), "a2": create("a2", a),
+            "b": create("b", root), "other": create("other")}
+
+
+def test_create(db, client, headers, tree):
+    assert_consistent(db)
+    assert client.get(f"/{tree['root']}", headers=headers).json()["descendant_count"] == 4
+
+
+def test_batch_create(db, client, headers, tree):
+    response = client.post("/batch", json={"operations": [
+        {"op": "create", "ref": "p", "task": {"title": "p", "parent_id": tree["a1"]}},
+        {"op": "create", "parent_ref": "p", "task": {"title": "p1"}},
+        {"op": "create", "parent_ref": "p", "task": {"title": "p2"}},
+    ]}, headers=headers)
+    assert response.status_code == 200
+    assert all(result["ok"] for result in response.json())
+    assert_consistent(db)
+    assert client.get(f"/{tree['root']}", headers=headers).json()["descendant_count"] == 7
+
+
+def test_complete_and_uncomplete(db, client, headers, tree):
+    client.post(f"/{tree['a']}/complete", headers=headers)
+    assert_consistent(db)
+    assert client.get(f"/{tree['root']}", headers=headers).json()["descendant_completed_count"] == 3
+
+    client.put(f"/{tree['a2']}", json={"is_completed": False}, headers=headers)
+    assert_consistent(db)
+    assert client.get(f"/{tree['root']}", headers=headers).json()["descendant_completed_count"] == 2
+
+    client.put(f"/{tree['a']}", json={"is_completed": False}, headers=headers)
+    assert_consistent(db)
+    assert client.get(f"/{tree['root']}", headers=headers).json()["descendant_completed_count"] == 0
+
+
+def test_reparent(db, client, headers, tree):
+    client.post(f"/{tree['a1']}/complete", headers=headers)
+    client.put(f"/{tree['a']}", json={"parent_id": tree["other"]}, headers=headers)
+    assert_consistent(db)
+    client.put(f"/{tree['a1']}", json={"parent_id": None}, headers=headers)
+    assert_consistent(db)
+    assert client.put(f"/{tree['other']}", json={"parent_id": tree["a2"]}, headers=headers).status_code == 400
+    assert_consistent(db)
+
+
+def test_delete(db, client, headers, tree):
+    client.post(f"/{tree['a2']}/complete", headers=headers)
+    assert client.delete(f"/{tree['a']}", headers=headers).status_code == 204
+    assert_consistent(db)
+    root = client.get(f"/{tree['root']}", headers=headers).json()
+    assert (root["descendant_count"], root["descendant_completed_count"]) == (1, 0)
+
+    assert purge_deleted_tasks(db) == 3
+    assert_consistent(db)
+
+
+def test_clone(db, client, headers, tree):
+    client.post(f"/{tree['a1']}/complete", headers=headers)
+    assert client.post(f"/{tree['a']}/clone", headers=headers).status_code == 201
+    assert_consistent(db)
+    assert client.get(f"/{tree['root']}", headers=headers).json()["descendant_count"] == 7
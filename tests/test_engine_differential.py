@@ -0,0 +1,167 @@
+"""
+Дифференциальная проверка колоночного движка метрик
+
+Сравнивает app.analytics.engine с эталонным конвейером из пошаговых функций
+productivity.py на случайных рядах с фиксированным seed. Числа должны
+совпадать бит-в-бит.
+"""
+import random
+import struct
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Iterator, Tuple
+
+from app.analytics.productivity import (
+    clean_data,
+    calculate_weekday_productivity,
+    normalize_seasonality,
+    calculate_moving_averages,
+    calculate_ema,
+    calculate_z_score,
+    calculate_burnout_components,
+    calculate_burnout_risk_index,
+    get_top_weekdays,
+    calculate_productivity_metrics
+)
+
+
+def reference_metrics(daily_data: List[Dict]) -> Dict:
+    """
+    Эталонный конвейер: пошаговые функции productivity.py над списками словарей
+    """
+    # Очистка данных
+    cleaned_data = clean_data(daily_data)
+    
+    if not cleaned_data:
+        return {
+            'weekday_productivity': {},
+            'top_weekdays': [],
+            'adj_tasks': [],
+            'factors': {},
+            'moving_averages': {},
+            'ema_values': [],
+            'z_score': 0.0
+        }
+    
+    # Извлечение данных
+    dates = [r['date'] for r in cleaned_data]
+    tasks_raw = [r.get('tasks_done', 0) for r in cleaned_data]
+    streaks = [r.get('streak', 0) for r in cleaned_data]
+    
+    # 1. Продуктивность по дням недели
+    weekday_means = calculate_weekday_productivity(cleaned_data)
+    
+    # 2. Нормализация сезонности
+    adj_tasks, factors = normalize_seasonality(cleaned_data, weekday_means)
+    
+    # 3. Скользящие средние
+    moving_avgs = calculate_moving_averages(adj_tasks)
+    
+    # 4. EMA
+    ema_values = calculate_ema(adj_tasks, alpha=0.25)
+    
+    # 5. Z-score для последнего дня
+    z_score = 0.0
+    if adj_tasks:
+        z_score = calculate_z_score(
+            adj_tasks[-1],
+            moving_avgs['mean_28'],
+            moving_avgs['std_28']
+        )
+    
+    # 6. Компоненты риска выгорания
+    components = calculate_burnout_components(
+        adj_tasks,
+        tasks_raw,
+        streaks,
+        ema_values,
+        moving_avgs['mean_28'],
+        moving_avgs['mean_7']
+    )
+    
+    # 7. Индекс риска выгорания
+    risk_index, risk_category = calculate_burnout_risk_index(components)
+    
+    # 8. ТОП-дни недели
+    top_weekdays = get_top_weekdays(weekday_means, top_n=2)
+    
+    return {
+        'weekday_productivity': {str(k): float(v) for k, v in weekday_means.items()},
+        'top_weekdays': [{'weekday': w, 'mean_tasks': float(m)} for w, m in top_weekdays],
+        'adj_tasks': [float(x) for x in adj_tasks],
+        'factors': {str(k): float(v) for k, v in factors.items()},
+        'moving_averages': moving_avgs,
+        'ema_values': [float(x) for x in ema_values],
+        'z_score': float(z_score),
+        'burnout_risk': {
+            'index': risk_index,
+            'category': risk_category,
+            'components': components
+        },
+        'dates': [d.isoformat() if isinstance(d, (datetime, date)) else str(d) for d in dates],
+        'tasks_raw': tasks_raw,
+        'streaks': streaks
+    }
+
+
+
+def random_daily_data(rng: random.Random) -> List[Dict]:
+    """Случайный дневной ряд: разные длины, нули, дубликаты, строки и datetime"""
+    n = rng.choice([0, 1, 2, 6, 7, 13, 27, 28, 29, 60, 61, 128, 129, 365, 400])
+    start = date(2024, 1, 1) + timedelta(days=rng.randint(-800, 800))
+    zero_rate = rng.random()
+    scale = rng.choice([1, 3, 10, 50])
+    data = []
+    streak = 0
+    for i in range(n):
+        tasks = 0 if rng.random() < zero_rate else rng.randint(1, scale)
+        streak = streak + 1 if tasks else 0
+        day = start + timedelta(days=i)
+        kind = rng.random()
+        if kind < 0.1:
+            day_value = day.isoformat() + 'T10:00:00Z'
+        elif kind < 0.2:
+            day_value = datetime.combine(day, datetime.min.time())
+        else:
+            day_value = day
+        record = {'date': day_value, 'tasks_done': tasks, 'streak': streak}
+        if rng.random() < 0.02:
+            record['tasks_done'] = None
+        data.append(record)
+    if data and rng.random() < 0.2:
+        data.append(dict(rng.choice(data), tasks_done=rng.randint(0, scale)))
+    rng.shuffle(data)
+    return data
+
+
+def _bits(value) -> object:
+    """Нормализация значения для побитового сравнения"""
+    if isinstance(value, float):
+        return struct.pack('<d', float(value))
+    if isinstance(value, dict):
+        return {k: _bits(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_bits(v) for v in value]
+    return value
+
+
+def _diff(expected, actual, path: str = '') -> Iterator[Tuple[str, object, object]]:
+    """Перечисление расхождений между двумя результатами"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in expected.keys() | actual.keys():
+            yield from _diff(expected.get(key), actual.get(key), f"{path}.{key}")
+    elif isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        for i, (e, a) in enumerate(zip(expected, actual)):
+            yield from _diff(e, a, f"{path}[{i}]")
+    elif _bits(expected) != _bits(actual):
+        yield path, expected, actual
+
+
+def test_engine_matches_reference_bit_for_bit():
+    rng = random.Random(0)
+    mismatches = []
+    for case in range(300):
+        daily_data = random_daily_data(rng)
+        expected = reference_metrics([dict(r) for r in daily_data])
+        actual = calculate_productivity_metrics(daily_data)
+        mismatches.extend((case, path, e, a) for path, e, a in _diff(expected, actual))
+    assert mismatches == []
@@ -0,0 +1,73 @@
+"""
+Условные GET коллекций по ETag (check_collection_etag)
+"""
+import pytest
+
+
+@pytest.fixture
+def data(client, headers):
+    task = client.post("/", json={"title": "task"}, headers=headers).json()["id"]
+    other = client.post("/", json={"title": "other"}, headers=headers).json()["id"]
+    task_list = client.post("/lists/", json={"name": "inbox"}, headers=headers).json()["id"]
+    return {"task": task, "other": other, "list": task_list}
+
+
+def etag(client, headers, path="/"):
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200
+    return response.headers["ETag"]
+
+
+@pytest.mark.parametrize("path", ["/", "/search?q=task", "/{task}", "/{task}/tree",
+                                  "/lists/", "/lists/{list}", "/lists/{list}/tasks"])
+def test_matching_if_none_match_returns_304(client, headers, data, path):
+    path = path.format(**data)
+    tag = etag(client, headers, path)
+    for if_none_match in (tag, tag.removeprefix("W/"), f'"stale", {tag}', "*"):
+        response = client.get(path, headers={**headers, "If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == tag
+    assert client.get(path, headers={**headers, "If-None-Match": '"stale"'}).status_code == 200
+
+
+WRITES = {
+    "create": lambda c, h, d: c.post("/", json={"title": "new"}, headers=h),
+    "update": lambda c, h, d: c.put(f"/{d['task']}", json={"title": "renamed"}, headers=h),
+    "move": lambda c, h, d: c.post(f"/{d['task']}/move", json={"after_id": d["other"]}, headers=h),
+    "complete": lambda c, h, d: c.post(f"/{d['task']}/complete", headers=h),
+    "delete": lambda c, h, d: c.delete(f"/{d['task']}", headers=h),
+    "clone": lambda c, h, d: c.post(f"/{d['task']}/clone", headers=h),
+    "batch": lambda c, h, d: c.post("/batch", json={"operations": [{"op": "complete", "task_id": d["task"]}]},
+                                    headers=h),
+    "list create": lambda c, h, d: c.post("/lists/", json={"name": "exam"}, headers=h),
+    "list update": lambda c, h, d: c.put(f"/lists/{d['list']}", json={"name": "renamed"}, headers=h),
+    "list delete": lambda c, h, d: c.delete(f"/lists/{d['list']}", headers=h),
+    "list add": lambda c, h, d: c.post(f"/lists/{d['list']}/tasks", params={"task_id": d["task"]}, headers=h),
+    "list bulk": lambda c, h, d: c.post(f"/lists/{d['list']}/tasks/bulk",
+                                        json={"op": "add", "task_ids": [d["task"]]}, headers=h),
+}
+
+
+@pytest.mark.parametrize("write", WRITES.values(), ids=WRITES.keys())
+def test_every_write_changes_etag(client, headers, data, write):
+    before = etag(client, headers)
+    assert write(client, headers, data).status_code < 300
+    after = etag(client, headers)
+    assert after != before
+    assert client.get("/", headers={**headers, "If-None-Match": before}).status_code == 200
+
+
+def test_list_remove_changes_etag(client, headers, data):
+    client.post(f"/lists/{data['list']}/tasks", params={"task_id": data["task"]}, headers=headers)
+    before = etag(client, headers, "/lists/")
+    assert client.delete(f"/lists/{data['list']}/tasks/{data['task']}", headers=headers).status_code == 204
+    assert etag(client, headers, "/lists/") != before
+
+
+def test_other_users_writes_keep_etag(client, headers, register, data):
+    before = etag(client, headers)
+    other = register("other")
+    client.post("/", json={"title": "foreign"}, headers=other)
+    assert etag(client, headers) == before
+    assert etag(client, other) != before
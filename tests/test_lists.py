@@ -0,0 +1,64 @@
+"""
+Массовое изменение состава списка (POST /lists/{list_id}/tasks/bulk)
+"""
+import pytest
+
+
+@pytest.fixture
+def lists(client, headers):
+    return [client.post("/lists/", json={"name": name}, headers=headers).json()["id"]
+            for name in ("inbox", "exam")]
+
+
+@pytest.fixture
+def tasks(client, headers):
+    return [client.post("/", json={"title": f"task {i}"}, headers=headers).json()["id"] for i in range(4)]
+
+
+def bulk(client, headers, list_id, **body):
+    return client.post(f"/lists/{list_id}/tasks/bulk", json=body, headers=headers)
+
+
+def list_task_ids(client, headers, list_id):
+    return [task["id"] for task in client.get(f"/lists/{list_id}/tasks", headers=headers).json()]
+
+
+def test_add_remove_move(client, headers, lists, tasks):
+    inbox, exam = lists
+    response = bulk(client, headers, inbox, op="add", task_ids=tasks[::-1])
+    assert response.status_code == 200
+    assert all(result["ok"] for result in response.json())
+    assert list_task_ids(client, headers, inbox) == tasks[::-1]
+
+    response = bulk(client, headers, inbox, op="remove", task_ids=[tasks[0], tasks[1]])
+    assert [result["ok"] for result in response.json()] == [True, True]
+    assert list_task_ids(client, headers, inbox) == [tasks[3], tasks[2]]
+
+    response = bulk(client, headers, inbox, op="move", task_ids=[tasks[2], tasks[0]], target_list_id=exam)
+    assert response.json() == [
+        {"task_id": tasks[2], "ok": True, "error": None},
+        {"task_id": tasks[0], "ok": False, "error": "not_found"},
+    ]
+    assert list_task_ids(client, headers, inbox) == [tasks[3]]
+    assert list_task_ids(client, headers, exam) == [tasks[2]]
+
+
+def test_foreign_and_subtask_ids_are_rejected(client, headers, register, lists, tasks):
+    other = register("other")
+    foreign = client.post("/", json={"title": "foreign"}, headers=other).json()["id"]
+    subtask = client.post("/", json={"title": "sub", "parent_id": tasks[0]}, headers=headers).json()["id"]
+
+    response = bulk(client, headers, lists[0], op="add", task_ids=[tasks[1], foreign, subtask, 10 ** 6])
+    assert [result["ok"] for result in response.json()] == [True, False, False, False]
+    assert list_task_ids(client, headers, lists[0]) == [tasks[1]]
+    assert client.get(f"/{foreign}", headers=other).json()["task_list_id"] is None
+
+
+def test_missing_list_and_invalid_target(client, headers, register, lists, tasks):
+    assert bulk(client, headers, 10 ** 6, op="add", task_ids=tasks).status_code == 404
+    foreign_list = client.post("/lists/", json={"name": "theirs"}, headers=register("other")).json()["id"]
+    assert bulk(client, headers, foreign_list, op="add", task_ids=tasks).status_code == 404
+
+    assert bulk(client, headers, lists[0], op="move", task_ids=tasks).status_code == 400
+    assert bulk(client, headers, lists[0], op="move", task_ids=tasks, target_list_id=foreign_list).status_code == 400
+    assert bulk(client, headers, lists[0], op="add", task_ids=[]).status_code == 422
@@ -0,0 +1,81 @@
+"""
+Дробные ключи порядка (app/crud/position.py)
+"""
+import random
+
+import pytest
+from sqlalchemy import update
+
+from app.crud.position import even_keys, key_between, rebalance_positions
+from app.models.task import POSITION_MAX_LENGTH, Task
+
+
+def appended(count):
+    """Ключи count задач, по очереди добавленных в конец группы (в порядке добавления)"""
+    keys = [key_between(None, None)]
+    for _ in range(count - 1):
+        keys.append(key_between(keys[-1], None))
+    return keys
+
+
+def prepended(count):
+    """Ключи count задач, по очереди добавленных в начало группы (в порядке добавления)"""
+    keys = [key_between(None, None)]
+    for _ in range(count - 1):
+        keys.append(key_between(None, keys[-1]))
+    return keys
+
+
+def test_append_keys_grow_logarithmically():
+    keys = appended(10000)
+    assert keys == sorted(set(keys))
+    assert max(len(key) for key in keys[:50]) <= 3
+    assert max(len(key) for key in keys[:200]) <= 3
+    assert max(len(key) for key in keys) <= 5
+
+
+def test_prepend_keys_grow_logarithmically():
+    keys = prepended(10000)
+    assert keys == sorted(set(keys), reverse=True)
+    assert max(len(key) for key in keys[:50]) <= 3
+    assert max(len(key) for key in keys[:200]) <= 3
+    assert max(len(key) for key in keys) <= 5
+
+
+def test_random_inserts_keep_order():
+    rng = random.Random(7)
+    keys = []
+    for _ in range(2000):
+        index = rng.randint(0, len(keys))
+        before = keys[index - 1] if index > 0 else None
+        after = keys[index] if index < len(keys) else None
+        key = key_between(before, after)
+        assert key and not key.endswith("0")
+        keys.insert(index, key)
+    assert keys == sorted(keys)
+
+
+def test_invalid_bounds():
+    with pytest.raises(ValueError):
+        key_between("V", "V")
+    with pytest.raises(ValueError):
+        key_between("W", "V")
+
+
+def test_even_keys_are_short_and_ordered():
+    keys = even_keys(1000)
+    assert keys == sorted(keys) and len(set(keys)) == 1000
+    assert max(len(key) for key in keys) == 2
+
+
+def test_rebalance_bumps_collection_version(db, client, headers):
+    ids = [client.post("/", json={"title": f"task {i}"}, headers=headers).json()["id"] for i in range(3)]
+    etag = client.get("/", headers=headers).headers["ETag"]
+    db.execute(update(Task).where(Task.id == ids[1]).values(position="V" + "1" * POSITION_MAX_LENGTH))
+    db.commit()
+
+    assert rebalance_positions(db) == 1
+    response = client.get("/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert [task["id"] for task in response.json()] == ids
+    assert max(len(task["position"]) for task in response.json()) == 1
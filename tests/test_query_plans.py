@@ -0,0 +1,76 @@
+"""
+Планы запросов главного экрана: частичные и покрывающий индексы задач
+(ix_tasks_open_*, ix_tasks_owner_summary) должны оставаться в использовании
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app.crud.task import get_agenda, get_task_summary, get_urgent_tasks
+from app.database.base import engine
+from app.models.task import Task
+from app.models.user import User
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+@pytest.fixture
+def user_id(db):
+    user = User(email="plans@example.com", username="plans", hashed_password="-")
+    db.add(user)
+    db.flush()
+    db.add_all(
+        Task(title=f"task {i}", owner_id=user.id, priority=i % 3 + 1, is_completed=i % 4 == 0,
+             due_date=NOW + timedelta(hours=i) if i % 3 else None,
+             scheduled_date=NOW + timedelta(hours=2 * i) if i % 2 else None)
+        for i in range(200)
+    )
+    db.commit()
+    return user.id
+
+
+def query_plans(db, call):
+    """Планы (EXPLAIN QUERY PLAN) всех SELECT из tasks, выполненных call()"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM tasks" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    cursor = db.connection().connection.cursor()
+    return [[row[3] for row in cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)]
+            for statement, parameters in statements]
+
+
+def assert_indexed(plans, *indexes):
+    used = set()
+    for plan in plans:
+        assert not any(step.startswith("SCAN tasks") for step in plan), plan
+        used |= {index for index in indexes for step in plan if f"INDEX {index} " in step}
+    assert used == set(indexes), plans
+
+
+def test_agenda_reads_open_partial_indexes_in_order(db, user_id):
+    plans = query_plans(db, lambda: get_agenda(db, user_id, NOW, NOW + timedelta(days=7), limit=20))
+    assert_indexed(plans, "ix_tasks_open_scheduled", "ix_tasks_open_due")
+    assert not any("TEMP B-TREE" in step for plan in plans for step in plan), plans
+
+
+def test_urgent_tasks_read_priority_due_index(db, user_id):
+    plans = query_plans(db, lambda: get_urgent_tasks(db, user_id, limit=5, now=NOW))
+    assert_indexed(plans, "ix_tasks_open_priority_due")
+
+    plans = query_plans(db, lambda: get_urgent_tasks(db, user_id, limit=5, now=NOW,
+                                                     start=NOW, end=NOW + timedelta(days=7)))
+    assert_indexed(plans, "ix_tasks_open_priority_due", "ix_tasks_open_scheduled")
+
+
+def test_summary_reads_covering_index(db, user_id):
+    plans = query_plans(db, lambda: get_task_summary(db, user_id, now=NOW))
+    assert plans == [["SEARCH tasks USING COVERING INDEX ix_tasks_owner_summary (owner_id=?)"]]
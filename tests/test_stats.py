@@ -0,0 +1,79 @@
+"""
+Rollup выполненных задач по дням, неделям и месяцам (app/crud/stats.py)
+"""
+from datetime import date, datetime
+
+from app.crud.stats import check_daily_stats, check_period_stats, ensure_daily_stats, rebuild_daily_stats
+from app.models.stats import UserDailyStats, UserPeriodStats
+from app.models.task import Task
+
+
+def assert_rollup_consistent(db):
+    db.expire_all()
+    assert check_daily_stats(db) == []
+    assert check_period_stats(db) == []
+
+
+def test_ensure_daily_stats_backfills_empty_rollup(db, client, headers):
+    for title in ("a", "b"):
+        task_id = client.post("/", json={"title": title}, headers=headers).json()["id"]
+        client.post(f"/{task_id}/complete", headers=headers)
+    db.query(UserPeriodStats).delete()
+    db.query(UserDailyStats).delete()
+    db.commit()
+    assert check_daily_stats(db) != []
+
+    assert ensure_daily_stats(db) is True
+    assert_rollup_consistent(db)
+    assert ensure_daily_stats(db) is False
+
+
+def test_ensure_daily_stats_without_completed_tasks(db, client, headers):
+    client.post("/", json={"title": "open"}, headers=headers)
+    assert ensure_daily_stats(db) is False
+    assert db.query(UserDailyStats).count() == 0
+
+
+def test_rollup_follows_complete_uncomplete_and_delete(db, client, headers):
+    root = client.post("/", json={"title": "root"}, headers=headers).json()["id"]
+    child = client.post("/", json={"title": "child", "parent_id": root}, headers=headers).json()["id"]
+    other = client.post("/", json={"title": "other"}, headers=headers).json()["id"]
+
+    client.post(f"/{root}/complete", headers=headers)
+    assert_rollup_consistent(db)
+    assert db.query(UserDailyStats).one().tasks_done == 2
+
+    client.put(f"/{child}", json={"is_completed": False}, headers=headers)
+    assert_rollup_consistent(db)
+    client.post("/batch", json={"operations": [
+        {"op": "complete", "task_id": other},
+        {"op": "update", "task_id": child, "changes": {"is_completed": True}},
+    ]}, headers=headers)
+    assert_rollup_consistent(db)
+    assert db.query(UserDailyStats).one().tasks_done == 3
+
+    client.delete(f"/{root}", headers=headers)
+    assert_rollup_consistent(db)
+    assert db.query(UserDailyStats).one().tasks_done == 1
+    client.put(f"/{other}", json={"is_completed": False}, headers=headers)
+    assert_rollup_consistent(db)
+    assert db.query(UserDailyStats).one().tasks_done == 0
+
+
+def test_rollup_moves_day_when_completed_at_is_set(db, client, headers):
+    """Выполненная задача без completed_at учтена по created_at; повторное выполнение проставляет completed_at"""
+    task_id = client.post("/", json={"title": "legacy"}, headers=headers).json()["id"]
+    created = datetime(2025, 12, 30, 10, 0)
+    db.query(Task).filter(Task.id == task_id).update({"created_at": created, "is_completed": True})
+    db.commit()
+    rebuild_daily_stats(db)
+    assert [(row.day, row.tasks_done) for row in db.query(UserDailyStats)] == [(created.date(), 1)]
+
+    client.post(f"/{task_id}/complete", headers=headers)
+    assert_rollup_consistent(db)
+    today = datetime.utcnow().date()
+    assert [(row.day, row.tasks_done) for row in db.query(UserDailyStats).filter(UserDailyStats.tasks_done != 0)] \
+        == [(today, 1)]
+    periods = {(row.granularity, row.period_start): row.tasks_done for row in db.query(UserPeriodStats)}
+    assert periods[("month", date(2025, 12, 1))] == 0
+    assert periods[("month", today.replace(day=1))] == 1
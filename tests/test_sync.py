@@ -0,0 +1,127 @@
+"""
+Дельта-синхронизация (GET /sync/changes) и журнал change_log
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from app.crud.sync import compact_change_log
+from app.crud.task import purge_deleted_tasks
+from app.database.base import engine
+from app.models.sync import ChangeLog
+
+MIGRATIONS = Path(__file__).resolve().parent.parent / "migrations"
+
+
+def journaled_task_ids(db, after_seq=0):
+    db.expire_all()
+    return [entry.entity_id for entry in db.query(ChangeLog).filter(
+        ChangeLog.entity == "task", ChangeLog.seq > after_seq
+    ).order_by(ChangeLog.seq)]
+
+
+def last_seq(db):
+    return db.query(ChangeLog.seq).order_by(ChangeLog.seq.desc()).limit(1).scalar() or 0
+
+
+@pytest.mark.parametrize("migrated", [False, True])
+def test_counter_updates_of_ancestors_are_not_journaled(db, client, headers, migrated):
+    if migrated:
+        connection = engine.raw_connection()
+        try:
+            connection.executescript((MIGRATIONS / "014_narrow_change_log_task_trigger.sql").read_text())
+        finally:
+            connection.close()
+    parent_id = None
+    for title in ("root", "a", "b", "c"):
+        parent_id = client.post("/", json={"title": title, "parent_id": parent_id}, headers=headers).json()["id"]
+
+    seq = last_seq(db)
+    leaf = client.post("/", json={"title": "leaf", "parent_id": parent_id}, headers=headers).json()["id"]
+    assert journaled_task_ids(db, seq) == [leaf]
+
+    seq = last_seq(db)
+    client.post(f"/{leaf}/complete", headers=headers)
+    assert journaled_task_ids(db, seq) == [leaf]
+
+    seq = last_seq(db)
+    client.put(f"/{leaf}", json={"title": "renamed"}, headers=headers)
+    assert journaled_task_ids(db, seq) == [leaf]
+
+
+def changes(client, headers, since, **params):
+    response = client.get("/sync/changes", params={"since": since, **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_cursor_round_trip(client, headers, register):
+    first = client.post("/", json={"title": "first"}, headers=headers).json()["id"]
+    snapshot = changes(client, headers, 0)
+    assert [task["id"] for task in snapshot["tasks"]] == [first]
+    cursor = snapshot["cursor"]
+
+    nothing = changes(client, headers, cursor)
+    assert (nothing["tasks"], nothing["cursor"], nothing["has_more"]) == ([], cursor, False)
+
+    second = client.post("/", json={"title": "second"}, headers=headers).json()["id"]
+    client.put(f"/{first}", json={"title": "first, edited"}, headers=headers)
+    client.put(f"/{first}", json={"priority": 3}, headers=headers)
+    list_id = client.post("/lists/", json={"name": "inbox"}, headers=headers).json()["id"]
+    client.post("/", json={"title": "foreign"}, headers=register("other"))
+
+    delta = changes(client, headers, cursor)
+    assert sorted(task["id"] for task in delta["tasks"]) == [first, second]
+    assert {task["id"]: task["title"] for task in delta["tasks"]}[first] == "first, edited"
+    assert [task_list["id"] for task_list in delta["lists"]] == [list_id]
+    assert delta["cursor"] > cursor
+
+    # Постранично: has_more, пока журнал не прочитан до конца
+    seen, page_cursor = set(), cursor
+    while True:
+        page = changes(client, headers, page_cursor, limit=1)
+        seen |= {task["id"] for task in page["tasks"]}
+        page_cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert seen == {first, second} and page_cursor == delta["cursor"]
+    assert changes(client, headers, delta["cursor"])["tasks"] == []
+
+
+def test_deleted_ids_are_reported(db, client, headers):
+    root = client.post("/", json={"title": "root"}, headers=headers).json()["id"]
+    child = client.post("/", json={"title": "child", "parent_id": root}, headers=headers).json()["id"]
+    kept = client.post("/", json={"title": "kept"}, headers=headers).json()["id"]
+    list_id = client.post("/lists/", json={"name": "inbox"}, headers=headers).json()["id"]
+    cursor = changes(client, headers, 0)["cursor"]
+
+    client.delete(f"/{root}", headers=headers)
+    client.delete(f"/lists/{list_id}", headers=headers)
+    delta = changes(client, headers, cursor)
+    assert delta["deleted_tasks"] == [root, child]
+    assert delta["deleted_lists"] == [list_id]
+    assert delta["tasks"] == []
+
+    # После физической очистки удаленные по-прежнему сообщаются как удаленные
+    purge_deleted_tasks(db)
+    delta = changes(client, headers, cursor)
+    assert delta["deleted_tasks"] == [root, child]
+    assert [task["id"] for task in changes(client, headers, 0)["tasks"]] == [kept]
+
+
+def test_cursor_older_than_compacted_journal_is_gone(db, client, headers):
+    client.post("/", json={"title": "old"}, headers=headers)
+    old_cursor = changes(client, headers, 0)["cursor"]
+    client.post("/", json={"title": "also old"}, headers=headers)
+    db.query(ChangeLog).update({"changed_at": datetime.utcnow() - timedelta(days=40)})
+    db.commit()
+    fresh = client.post("/", json={"title": "new"}, headers=headers).json()["id"]
+
+    assert compact_change_log(db, retention_days=30) == 2
+    response = client.get("/sync/changes", params={"since": old_cursor}, headers=headers)
+    assert response.status_code == 410
+
+    snapshot = changes(client, headers, 0)
+    assert len(snapshot["tasks"]) == 3
+    assert [task["id"] for task in changes(client, headers, snapshot["cursor"] - 1)["tasks"]] == [fresh]
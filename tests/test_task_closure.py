@@ -0,0 +1,64 @@
+"""
+Таблица замыкания task_closure: защита от циклов и согласованность с parent_id
+"""
+import pytest
+
+from app.crud.closure import check_task_closure
+from app.models.task import Task
+
+
+@pytest.fixture
+def chain(client, headers):
+    """root -> a -> b -> c и отдельный корень other"""
+    ids = {}
+    parent_id = None
+    for title in ("root", "a", "b", "c"):
+        ids[title] = parent_id = client.post(
+            "/", json={"title": title, "parent_id": parent_id}, headers=headers
+        ).json()["id"]
+    ids["other"] = client.post("/", json={"title": "other"}, headers=headers).json()["id"]
+    return ids
+
+
+def parent_of(db, task_id):
+    db.expire_all()
+    return db.get(Task, task_id).parent_id
+
+
+@pytest.mark.parametrize("new_parent", ["a", "b", "c"])
+def test_reparent_into_own_subtree_is_rejected(db, client, headers, chain, new_parent):
+    response = client.put(f"/{chain['a']}", json={"parent_id": chain[new_parent]}, headers=headers)
+    assert response.status_code == 400
+    assert parent_of(db, chain["a"]) == chain["root"]
+    assert check_task_closure(db) == 0
+
+
+def test_batch_reparent_into_own_subtree_is_rejected(db, client, headers, chain):
+    response = client.post("/batch", json={"operations": [
+        {"op": "update", "task_id": chain["root"], "changes": {"parent_id": chain["c"]}},
+    ]}, headers=headers)
+    assert response.json()[0]["ok"] is False
+    assert parent_of(db, chain["root"]) is None
+    assert check_task_closure(db) == 0
+
+
+def test_move_cannot_use_task_from_own_subtree_as_neighbour(db, client, headers, chain):
+    response = client.post(f"/{chain['a']}/move", json={"after_id": chain["b"]}, headers=headers)
+    assert response.status_code == 400
+    assert parent_of(db, chain["a"]) == chain["root"]
+
+
+def test_closure_after_reparent_and_subtree_delete(db, client, headers, chain):
+    assert client.put(f"/{chain['b']}", json={"parent_id": chain["other"]}, headers=headers).status_code == 200
+    assert check_task_closure(db) == 0
+    tree = client.get(f"/{chain['other']}/tree", headers=headers).json()
+    assert [child["id"] for child in tree["subtasks"]] == [chain["b"]]
+    assert [child["id"] for child in tree["subtasks"][0]["subtasks"]] == [chain["c"]]
+
+    assert client.put(f"/{chain['b']}", json={"parent_id": None}, headers=headers).status_code == 200
+    assert check_task_closure(db) == 0
+
+    assert client.delete(f"/{chain['b']}", headers=headers).status_code == 204
+    assert check_task_closure(db) == 0
+    assert client.get(f"/{chain['c']}", headers=headers).status_code == 404
+    assert client.put(f"/{chain['other']}", json={"parent_id": chain["c"]}, headers=headers).status_code == 400